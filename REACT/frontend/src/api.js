@@ -8,4 +8,13 @@ const Api = axios.create({
 Api.defaults.xsrfCookieName = 'csrftoken';
 Api.defaults.xsrfHeaderName = 'X-CSRFTOKEN';
 
+// Cursor-paginated lists (transactions, requests, loans) return { results, next_cursor };
+// pass the returned nextCursor back in to load the following page
+export const fetchPage = async (url, cursor = null, params = {}) => {
+  const res = await Api.get(url, {
+    params: cursor ? { ...params, cursor } : params,
+  });
+  return { results: res.data.results, nextCursor: res.data.next_cursor };
+};
+
 export default Api;
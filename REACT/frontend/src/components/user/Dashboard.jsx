@@ -7,12 +7,13 @@ import "./Dashboard.css";
 export default function Dashboard() {
   const [account, setAccount] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [lastEvent, setLastEvent] = useState(null);
   const navigate = useNavigate();
 
   const fetchAccount = async () => {
     try {
-      const res = await Api.get("user/accounts/", { withCredentials: true });
-      if (res.data.length > 0) setAccount(res.data[0]);
+      const res = await Api.get("user/dashboard/", { withCredentials: true });
+      if (res.data.accounts.length > 0) setAccount(res.data.accounts[0]);
     } catch (err) {
       console.log(err);
       navigate("/");
@@ -34,10 +35,35 @@ export default function Dashboard() {
     }
   };
 
-  // Polling to auto-update balance every 5 seconds
+  // Server-sent events push request and loan decisions and balance changes as soon as they commit
   useEffect(() => {
-    const interval = setInterval(fetchAccount, 5000);
-    return () => clearInterval(interval);
+    let interval = null;
+    const source = new EventSource(`${Api.defaults.baseURL}async/user/events/`, { withCredentials: true });
+
+    source.addEventListener("request.processed", (e) => {
+      const event = JSON.parse(e.data);
+      setLastEvent(event);
+      if (event.balance !== undefined) {
+        setAccount((current) =>
+          current && current.id === event.account ? { ...current, balance: event.balance } : current
+        );
+      }
+    });
+    source.addEventListener("loan.processed", (e) => setLastEvent(JSON.parse(e.data)));
+    // Every other posting (transfers, batch postings, EMI debits, repayments) only names the account
+    source.addEventListener("balance.changed", () => fetchAccount());
+
+    // The stream is refused without an ASGI server (e.g. runserver): poll every 5 seconds instead
+    source.onerror = () => {
+      if (source.readyState === EventSource.CLOSED && !interval) {
+        interval = setInterval(fetchAccount, 5000);
+      }
+    };
+
+    return () => {
+      source.close();
+      if (interval) clearInterval(interval);
+    };
   }, []);
 
   if (loading) {
@@ -126,6 +152,7 @@ export default function Dashboard() {
           <div className="content-column">
             <TransactionRequest 
               accountId={account.id} 
+              lastEvent={lastEvent}
               onSuccess={fetchAccount} // Refresh balance after request
             />
           </div>
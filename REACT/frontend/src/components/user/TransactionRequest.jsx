@@ -1,13 +1,23 @@
-import { useState } from "react";
+import { useEffect, useState } from "react";
 import Api from "../../api";
 import "./TransactionRequest.css";
 
-export default function TransactionRequest({ accountId, onSuccess }) {
+export default function TransactionRequest({ accountId, lastEvent, onSuccess }) {
   const [requestType, setRequestType] = useState("deposit");
   const [amount, setAmount] = useState("");
   const [description, setDescription] = useState("");
   const [error, setError] = useState("");
   const [success, setSuccess] = useState("");
+  const [pendingRequestId, setPendingRequestId] = useState(null);
+
+  // Decision for the request submitted from this form, pushed by the dashboard's event stream.
+  // Also re-checked when the id arrives, in case the decision was pushed before the POST returned
+  useEffect(() => {
+    if (lastEvent?.type === "request.processed" && lastEvent.request_id === pendingRequestId) {
+      setSuccess(`${lastEvent.request_type} request ${lastEvent.status}.`);
+      setPendingRequestId(null);
+    }
+  }, [lastEvent, pendingRequestId]);
 
   const handleSubmit = async (e) => {
     e.preventDefault();
@@ -19,7 +29,7 @@ export default function TransactionRequest({ accountId, onSuccess }) {
     }
 
     try {
-      await Api.post("userrequest/", {
+      const res = await Api.post("userrequest/", {
         user: accountId,
         request_type: requestType,
         account: accountId,
@@ -28,6 +38,7 @@ export default function TransactionRequest({ accountId, onSuccess }) {
         status: "pending"
       }, { withCredentials: true });
 
+      setPendingRequestId(res.data.request_id);
       setSuccess(`${requestType} request submitted successfully! Waiting for admin approval.`);
       setAmount(""); setDescription("");
 
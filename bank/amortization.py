@@ -0,0 +1,49 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+
+PAISA = Decimal('0.01')
+
+
+def to_paisa(value):
+    return Decimal(value).quantize(PAISA, rounding=ROUND_HALF_UP)
+
+
+def monthly_rate(interest_rate):
+    return Decimal(interest_rate) / Decimal(1200)
+
+
+# ===================== EMI =====================
+def calculate_emi(amount, interest_rate, duration_months):
+    if duration_months < 1:
+        raise ValueError('duration_months must be at least 1')
+    principal = Decimal(amount)
+    rate = monthly_rate(interest_rate)
+    if rate == 0:
+        return to_paisa(principal / duration_months)
+    growth = (1 + rate) ** duration_months
+    return to_paisa(principal * rate * growth / (growth - 1))
+
+
+# ===================== SCHEDULE =====================
+def amortization_schedule(amount, interest_rate, duration_months):
+    # Yields (emi_number, amount, principal, interest) rounded to the paisa; the final
+    # instalment absorbs the rounding drift so the principal repaid equals the loan amount
+    emi = calculate_emi(amount, interest_rate, duration_months)
+    rate = monthly_rate(interest_rate)
+    balance = to_paisa(amount)
+
+    for number in range(1, duration_months + 1):
+        interest = to_paisa(balance * rate)
+        if number == duration_months:
+            principal = balance
+        else:
+            principal = min(emi - interest, balance)
+        balance -= principal
+        yield number, principal + interest, principal, interest
+
+
+def total_payable(amount, interest_rate, duration_months):
+    return sum(
+        (instalment for _, instalment, _, _ in amortization_schedule(amount, interest_rate, duration_months)),
+        Decimal('0.00')
+    )
@@ -0,0 +1,118 @@
+import asyncio
+import json
+from functools import wraps
+
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import AuthenticationFailed, NotFound
+from rest_framework.request import Request
+
+from .caching import DASHBOARD_TIMEOUT, adashboard_cache_key
+from .dashboard import abuild_dashboard
+from .events import HEARTBEAT_SECONDS, broker
+from .models import BankAccount, Loan, Transaction
+from .pagination import CreatedAtCursorPagination, TransactionCursorPagination
+from .routers import primary_pin_key, replica_configured, replica_reads
+from .serializers import BankAccountSerializer, LoanSerializer, TransactionSerializer
+from .tokens import aauthenticate_token, bearer_token
+
+
+# ===================== ASYNC CUSTOMER VIEWS =====================
+# Read-only customer endpoints for ASGI deployments: the event loop keeps thousands of polls in
+# flight while the async ORM waits on the database, instead of pinning a worker thread per request.
+# Payloads match the DRF viewsets under /api/user/.
+def async_customer_view(view):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+
+        token = bearer_token(request.headers.get('Authorization', ''))
+        if token is not None:
+            try:
+                user, _ = await aauthenticate_token(token)
+            except AuthenticationFailed as exc:
+                response = JsonResponse({'detail': str(exc.detail)}, status=401)
+                response['WWW-Authenticate'] = 'Bearer'
+                return response
+        else:
+            user = await request.auser()
+        if not user.is_authenticated:
+            return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=403)
+
+        try:
+            if replica_configured() and not await cache.aget(primary_pin_key(user.pk), False):
+                with replica_reads():
+                    return await view(request, user, *args, **kwargs)
+            return await view(request, user, *args, **kwargs)
+        except NotFound as exc:
+            return JsonResponse({'detail': str(exc.detail)}, status=404)
+
+    return wrapper
+
+
+async def paginated(request, queryset, paginator, serializer_class):
+    drf_request = Request(request)
+    rows = await paginator.apaginate_queryset(serializer_class.setup_eager_loading(queryset), drf_request)
+    return JsonResponse(paginator.get_paginated_data(serializer_class(rows, many=True).data))
+
+
+@async_customer_view
+async def dashboard(request, user):
+    key = await adashboard_cache_key(user.pk)
+    payload = await cache.aget(key)
+    if payload is None:
+        payload = await abuild_dashboard(user)
+        await cache.aset(key, payload, DASHBOARD_TIMEOUT)
+    return JsonResponse(payload)
+
+
+@async_customer_view
+async def accounts(request, user):
+    queryset = BankAccountSerializer.setup_eager_loading(BankAccount.objects.filter(user=user).order_by('id'))
+    rows = [account async for account in queryset]
+    return JsonResponse(BankAccountSerializer(rows, many=True).data, safe=False)
+
+
+@async_customer_view
+async def transactions(request, user):
+    queryset = Transaction.objects.filter(account__user=user)
+    return await paginated(request, queryset, TransactionCursorPagination(), TransactionSerializer)
+
+
+@async_customer_view
+async def loans(request, user):
+    queryset = Loan.objects.filter(user=user)
+    return await paginated(request, queryset, CreatedAtCursorPagination(), LoanSerializer)
+
+
+# ===================== SERVER-SENT EVENTS =====================
+async def event_stream(user):
+    queue = broker.subscribe(user.pk)
+    try:
+        yield 'retry: 3000\nevent: ready\ndata: {}\n\n'
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                # Comment line keeps proxies from closing an idle stream
+                yield ': keepalive\n\n'
+                continue
+            yield f"event: {event['type']}\ndata: {json.dumps(event, cls=DjangoJSONEncoder)}\n\n"
+    finally:
+        broker.unsubscribe(user.pk, queue)
+
+
+@async_customer_view
+async def events(request, user):
+    # Pushes request and loan decisions the moment they commit, replacing dashboard polling.
+    # Needs an ASGI server: WSGI buffers the whole stream, which never ends, so the stream is
+    # refused there and the dashboard falls back to polling
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'detail': 'Event stream requires an ASGI server.'}, status=503)
+    response = StreamingHttpResponse(event_stream(user), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
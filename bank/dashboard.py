@@ -0,0 +1,80 @@
+from django.db.models import Count, OuterRef, Subquery
+
+from .amortization import to_paisa
+from .models import BankAccount, EMI, Loan, Transaction, UserRequest
+from .serializers import BankAccountSerializer, TransactionSerializer
+
+
+RECENT_TRANSACTIONS = 5
+ACTIVE_LOAN_STATUSES = ('approved', 'disbursed')
+OPEN_EMI_STATUSES = ('pending', 'overdue', 'defaulted')
+
+
+# ===================== DASHBOARD PAYLOAD =====================
+def dashboard_queries(user):
+    # Four queries regardless of how much history the user has
+    accounts = BankAccount.objects.filter(user=user).select_related('user').order_by('id')
+
+    recent = (
+        Transaction.objects.filter(account__user=user)
+        .order_by('-date', '-id')[:RECENT_TRANSACTIONS]
+    )
+
+    next_emi = EMI.objects.filter(loan=OuterRef('pk'), status__in=OPEN_EMI_STATUSES).order_by('emi_number')
+    loans = (
+        Loan.objects.filter(user=user, status__in=ACTIVE_LOAN_STATUSES)
+        .annotate(
+            next_emi_number=Subquery(next_emi.values('emi_number')[:1]),
+            next_emi_due=Subquery(next_emi.values('due_date')[:1]),
+            next_emi_amount=Subquery(next_emi.values('amount')[:1]),
+        )
+        .order_by('-created_at')
+    )
+
+    pending = (
+        UserRequest.objects.filter(user=user, status='pending')
+        .values('request_type')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+
+    return accounts, recent, loans, pending
+
+
+def build_dashboard(user):
+    return render_dashboard(user, *[list(queryset) for queryset in dashboard_queries(user)])
+
+
+async def abuild_dashboard(user):
+    rows = []
+    for queryset in dashboard_queries(user):
+        rows.append([row async for row in queryset])
+    return render_dashboard(user, *rows)
+
+
+def render_dashboard(user, accounts, recent, loans, pending):
+    return {
+        'user': {
+            'id': user.id,
+            'username': user.username,
+            'role': user.role
+        },
+        'accounts': list(BankAccountSerializer(accounts, many=True).data),
+        'recent_transactions': list(TransactionSerializer(recent, many=True).data),
+        'active_loans': [
+            {
+                'id': loan.id,
+                'loan_id': loan.loan_id,
+                'amount': str(loan.amount),
+                'status': loan.status,
+                'emi_amount': None if loan.emi_amount is None else str(loan.emi_amount),
+                'next_emi': None if loan.next_emi_number is None else {
+                    'emi_number': loan.next_emi_number,
+                    'due_date': loan.next_emi_due,
+                    'amount': str(to_paisa(loan.next_emi_amount)),
+                }
+            }
+            for loan in loans
+        ],
+        'pending_requests': {row['request_type']: row['count'] for row in pending},
+    }
@@ -0,0 +1,58 @@
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+
+
+MAX_QUEUED_EVENTS = 100
+HEARTBEAT_SECONDS = 15
+
+
+# ===================== EVENT BROKER =====================
+# In-process fan-out from the thread that committed a change to every open event stream of the
+# affected user. Streams live on the ASGI event loop, so events cross over with
+# call_soon_threadsafe. Each worker process has its own broker.
+class EventBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, user_id):
+        queue = asyncio.Queue(maxsize=MAX_QUEUED_EVENTS)
+        with self._lock:
+            self._subscribers[user_id].add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, user_id, queue):
+        with self._lock:
+            subscribers = self._subscribers.get(user_id, set())
+            subscribers.difference_update({entry for entry in subscribers if entry[1] is queue})
+            if not subscribers:
+                self._subscribers.pop(user_id, None)
+
+    def publish(self, user_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(offer, queue, event)
+            except RuntimeError:
+                # The stream's loop has shut down
+                self.unsubscribe(user_id, queue)
+
+
+def offer(queue, event):
+    # A stalled client loses its oldest events rather than growing the queue without bound
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(event)
+
+
+broker = EventBroker()
+
+
+def publish_on_commit(user_id, event_type, data):
+    # Nothing is pushed for a change that rolls back
+    event = {'type': event_type, **data}
+    transaction.on_commit(lambda: broker.publish(user_id, event))
@@ -0,0 +1,111 @@
+import threading
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.module_loading import import_string
+
+from .models import IdSequence
+
+
+# kind -> (prefix, digits); zero padding keeps string order equal to numeric order, so new
+# keys always land at the right edge of the unique index
+ID_FORMATS = {
+    'account': ('BNK', 10),
+    'loan': ('LOAN', 9),
+    'request': ('REQ', 9),
+}
+
+
+# ===================== CHECK DIGIT =====================
+def luhn_check_digit(digits):
+    total = 0
+    for position, digit in enumerate(reversed(digits)):
+        value = int(digit)
+        if position % 2 == 0:
+            value *= 2
+            if value > 9:
+                value -= 9
+        total += value
+    return str((10 - total % 10) % 10)
+
+
+def format_id(kind, value):
+    prefix, width = ID_FORMATS[kind]
+    digits = str(value).zfill(width)
+    return f"{prefix}{digits}{luhn_check_digit(digits)}"
+
+
+def is_valid_id(kind, identifier):
+    prefix, width = ID_FORMATS[kind]
+    digits = identifier[len(prefix):-1]
+    return (
+        identifier.startswith(prefix)
+        and len(digits) == width
+        and digits.isdigit()
+        and luhn_check_digit(digits) == identifier[-1]
+    )
+
+
+# ===================== ALLOCATORS =====================
+class SequenceIdAllocator:
+    # Reserves a block of values with a single UPDATE ... SET next_value = next_value + n and
+    # serves the rest of the block from memory, so most IDs cost no query at all
+    block_size = 100
+
+    def __init__(self, block_size=None):
+        self.block_size = block_size or self.block_size
+        self._blocks = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, name, count):
+        with transaction.atomic():
+            if not IdSequence.objects.filter(name=name).update(next_value=F('next_value') + count):
+                try:
+                    with transaction.atomic():
+                        IdSequence.objects.create(name=name, next_value=1 + count)
+                    return range(1, 1 + count)
+                except IntegrityError:
+                    IdSequence.objects.filter(name=name).update(next_value=F('next_value') + count)
+            end = IdSequence.objects.filter(name=name).values_list('next_value', flat=True).get()
+        return range(end - count, end)
+
+    def allocate(self, kind, count=1):
+        with self._lock:
+            cached = self._blocks.get(kind)
+            if cached and len(cached) >= count:
+                values, self._blocks[kind] = cached[:count], cached[count:]
+                return [format_id(kind, value) for value in values]
+
+        block = self.reserve(kind, max(count, self.block_size))
+        values, spare = block[:count], block[count:]
+        if spare:
+            # Spare values only become reusable once the reservation has committed; if the
+            # surrounding transaction rolls back, the counter rewinds and the spares are dropped
+            transaction.on_commit(lambda: self._release(kind, spare))
+        return [format_id(kind, value) for value in values]
+
+    def _release(self, kind, spare):
+        with self._lock:
+            if not self._blocks.get(kind):
+                self._blocks[kind] = spare
+
+
+_allocator = None
+
+
+def get_allocator():
+    global _allocator
+    if _allocator is None:
+        path = getattr(settings, 'BANK_ID_ALLOCATOR', 'bank.ids.SequenceIdAllocator')
+        _allocator = import_string(path)()
+    return _allocator
+
+
+def allocate_ids(kind, count):
+    # Pre-allocates a contiguous block for bulk inserts
+    return get_allocator().allocate(kind, count)
+
+
+def next_id(kind):
+    return allocate_ids(kind, 1)[0]
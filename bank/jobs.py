@@ -0,0 +1,157 @@
+import logging
+import threading
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.db.models.functions import Round
+from django.utils import timezone
+
+from .caching import invalidate_users
+from .ledger import post_batch
+from .models import BankAccount, EMI, JobCheckpoint
+from .repayments import OPEN_EMI_STATUSES, complete_paid_loans
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def job_setting(name, default):
+    return getattr(settings, name, default)
+
+
+# ===================== STATUS TRANSITIONS =====================
+# Each chunk moves rows out of the status it selects on, so a crashed run simply resumes by
+# selecting again: no cursor is needed and re-running is idempotent
+def _transition_chunks(queryset, chunk_size, **changes):
+    total = 0
+    while True:
+        chunk = list(queryset.order_by('due_date', 'id').values_list('id', 'loan__user_id')[:chunk_size])
+        if not chunk:
+            return total
+        with transaction.atomic():
+            total += queryset.filter(pk__in=[pk for pk, _ in chunk]).update(**changes)
+            invalidate_users(user_id for _, user_id in chunk)
+
+
+def mark_overdue(today, chunk_size=DEFAULT_CHUNK_SIZE):
+    cutoff = today - timedelta(days=job_setting('BANK_EMI_GRACE_DAYS', 0))
+    rate = Decimal(str(job_setting('BANK_EMI_PENALTY_RATE', '0.02')))
+    return _transition_chunks(
+        EMI.objects.filter(status='pending', due_date__lt=cutoff),
+        chunk_size,
+        status='overdue',
+        penalty=Round(F('amount') * rate, 2)
+    )
+
+
+def mark_defaulted(today, chunk_size=DEFAULT_CHUNK_SIZE):
+    cutoff = today - timedelta(days=job_setting('BANK_EMI_DEFAULT_DAYS', 90))
+    return _transition_chunks(
+        EMI.objects.filter(status='overdue', due_date__lt=cutoff),
+        chunk_size,
+        status='defaulted'
+    )
+
+
+# ===================== AUTO-DEBIT =====================
+def _debit_chunk(emis, today):
+    user_ids = {emi['loan__user_id'] for emi in emis}
+    with transaction.atomic():
+        # Balances are read under the account row locks, so a debit can never overdraw
+        accounts = {}
+        for account in (
+            BankAccount.objects.select_for_update()
+            .filter(user_id__in=user_ids, status='active')
+            .order_by('pk')
+            .values('pk', 'user_id', 'balance')
+        ):
+            accounts.setdefault(account['user_id'], account)
+
+        postings = []
+        paid = []
+        for emi in emis:
+            account = accounts.get(emi['loan__user_id'])
+            due = emi['amount'] + emi['penalty']
+            if account is None or account['balance'] < due:
+                continue
+            account['balance'] -= due
+            paid.append(emi)
+            postings.append({
+                'account': account['pk'],
+                'transaction_type': 'emi_repayment',
+                'amount': due,
+                'description': f"EMI auto-debit {emi['loan__loan_id']} #{emi['emi_number']}"
+            })
+
+        if paid:
+            post_batch(postings, allowed_types=('emi_repayment',))
+            EMI.objects.filter(pk__in=[emi['id'] for emi in paid]).update(status='paid', paid_date=today)
+            complete_paid_loans({emi['loan_id'] for emi in paid})
+            invalidate_users(emi['loan__user_id'] for emi in paid)
+    return len(paid)
+
+
+def auto_debit(today, chunk_size=DEFAULT_CHUNK_SIZE):
+    # EMIs the borrower cannot cover stay unpaid, so this phase walks ids with a checkpoint
+    # instead of re-selecting; a restarted run on the same day continues after the last chunk
+    checkpoint, _ = JobCheckpoint.objects.get_or_create(name='emi-auto-debit', defaults={'run_date': today})
+    if checkpoint.run_date != today:
+        checkpoint.run_date, checkpoint.last_id = today, 0
+        checkpoint.save()
+
+    debited = 0
+    due = EMI.objects.filter(status__in=OPEN_EMI_STATUSES, due_date__lte=today)
+    while True:
+        emis = list(
+            due.filter(id__gt=checkpoint.last_id)
+            .order_by('id')
+            .values('id', 'loan_id', 'loan__loan_id', 'loan__user_id', 'emi_number', 'amount', 'penalty')[:chunk_size]
+        )
+        if not emis:
+            return debited
+        debited += _debit_chunk(emis, today)
+        checkpoint.last_id = emis[-1]['id']
+        checkpoint.save(update_fields=['last_id', 'updated_at'])
+
+
+# ===================== JOB =====================
+def run_emi_job(today=None, debit=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    today = today or timezone.localdate()
+    if debit is None:
+        debit = job_setting('BANK_EMI_AUTO_DEBIT', False)
+
+    # Debits run first so borrowers who can pay are never marked overdue or penalised
+    result = {'run_date': today.isoformat()}
+    result['debited'] = auto_debit(today, chunk_size) if debit else 0
+    result['overdue'] = mark_overdue(today, chunk_size)
+    result['defaulted'] = mark_defaulted(today, chunk_size)
+    logger.info('EMI job finished: %s', result)
+    return result
+
+
+class EMIWorker(threading.Thread):
+    # Runs the EMI job every `interval` seconds inside the current process until stop() is called
+    def __init__(self, interval=3600, **job_options):
+        super().__init__(name='emi-worker', daemon=True)
+        self.interval = interval
+        self.job_options = job_options
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            close_old_connections()
+            try:
+                run_emi_job(**self.job_options)
+            except Exception:
+                logger.exception('EMI job failed')
+            finally:
+                close_old_connections()
+            self.stopped.wait(self.interval)
+
+    def stop(self):
+        self.stopped.set()
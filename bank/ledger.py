@@ -0,0 +1,368 @@
+import csv
+import io
+import json
+import uuid
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.db import connection, transaction
+from django.db.models import Case, DecimalField, F, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .caching import invalidate_users
+from .events import publish_on_commit
+from .models import BankAccount, BalanceSnapshot, Transaction
+from .outbox import posting_event, record_events
+
+
+# Keeps IN (...) lists well under SQLite's bound parameter limit
+LOOKUP_CHUNK_SIZE = 500
+# Transaction.amount is NUMERIC(12, 2); wider values fail on insert or get rounded by SQLite
+AMOUNT_DIGITS = Transaction._meta.get_field('amount').max_digits
+
+
+class PostingError(ValueError):
+    pass
+
+
+class InsufficientFunds(PostingError):
+    pass
+
+
+def _chunks(items, size=LOOKUP_CHUNK_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+# ===================== BALANCE DELTAS =====================
+CREDIT_TYPES = ('deposit',)
+DEBIT_TYPES = ('withdrawal', 'emi_repayment')
+# Transfer legs carry their direction in the sign of the amount
+SIGNED_TYPES = ('transfer',)
+
+
+def balance_delta(transaction_type, amount):
+    amount = Decimal(amount)
+    if transaction_type in CREDIT_TYPES or transaction_type in SIGNED_TYPES:
+        return amount
+    if transaction_type in DEBIT_TYPES:
+        return -amount
+    return Decimal('0')
+
+
+def signed_amount():
+    # SQL twin of balance_delta, for aggregating postings in the database
+    return Case(
+        When(transaction_type__in=CREDIT_TYPES + SIGNED_TYPES, then=F('amount')),
+        When(transaction_type__in=DEBIT_TYPES, then=-F('amount')),
+        default=Value(Decimal('0')),
+        output_field=DecimalField(max_digits=15, decimal_places=2),
+    )
+
+
+# ===================== POSTING ENGINE =====================
+def lock_accounts(account_ids):
+    # Row locks are taken in primary key order so concurrent postings never deadlock
+    if not connection.features.has_select_for_update:
+        return
+    for chunk in _chunks(sorted(set(account_ids))):
+        list(
+            BankAccount.objects.select_for_update()
+            .filter(pk__in=chunk)
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+
+
+def apply_balance_delta(account_id, delta):
+    # The increment is evaluated by the database and only the balance column is written,
+    # so concurrent postings to the same account cannot overwrite each other; the UPDATE
+    # itself takes the row lock, so no SELECT ... FOR UPDATE is needed first
+    if delta:
+        BankAccount.objects.filter(pk=account_id).update(balance=F('balance') + delta)
+
+
+def publish_balances(owners):
+    # {account_id: user_id}; open dashboards re-read the account once the posting commits
+    for account_id, user_id in owners.items():
+        publish_on_commit(user_id, 'balance.changed', {'account': account_id})
+
+
+def post_covered_debit(account, amount, transaction_type='withdrawal', description=''):
+    # The funds check and the decrement are a single conditional UPDATE, so no row has to be
+    # locked or read first and concurrent debits can never overdraw the account
+    with transaction.atomic():
+        covered = BankAccount.objects.filter(pk=account.pk, balance__gte=amount).update(
+            balance=F('balance') - amount
+        )
+        if not covered:
+            raise InsufficientFunds('Insufficient balance')
+        # bulk_create skips Transaction.save, whose balance update has already happened above
+        entry, = Transaction.objects.bulk_create([Transaction(
+            account=account,
+            transaction_type=transaction_type,
+            amount=amount,
+            description=description
+        )])
+        record_snapshots({account.pk: entry.date})
+        record_events([posting_event(entry, account.user_id)])
+        invalidate_users([account.user_id])
+        publish_balances({account.pk: account.user_id})
+    return entry
+
+
+def transfer(source, destination, amount, description=''):
+    # Both balance UPDATEs run in primary key order, so two transfers between the same pair of
+    # accounts in opposite directions queue on the first row instead of deadlocking; only the
+    # two account rows are locked. The legs share a reference and sum to zero.
+    if source.pk == destination.pk:
+        raise PostingError('Cannot transfer to the same account')
+
+    def debit():
+        covered = BankAccount.objects.filter(pk=source.pk, status='active', balance__gte=amount).update(
+            balance=F('balance') - amount
+        )
+        if not covered:
+            # Only a failed debit pays for the extra read that tells the two causes apart
+            if not BankAccount.objects.filter(pk=source.pk, status='active').exists():
+                raise PostingError('Source account is not active')
+            raise InsufficientFunds('Insufficient balance')
+
+    def credit():
+        if not BankAccount.objects.filter(pk=destination.pk, status='active').update(balance=F('balance') + amount):
+            raise PostingError('Destination account is not active')
+
+    reference = uuid.uuid4().hex
+    with transaction.atomic():
+        for step in (debit, credit) if source.pk < destination.pk else (credit, debit):
+            step()
+        legs = Transaction.objects.bulk_create([
+            Transaction(account=source, transaction_type='transfer', amount=-amount,
+                        description=description or f'Transfer to {destination.account_number}', reference=reference),
+            Transaction(account=destination, transaction_type='transfer', amount=amount,
+                        description=description or f'Transfer from {source.account_number}', reference=reference),
+        ])
+        record_snapshots({leg.account_id: leg.date for leg in legs})
+        record_events([posting_event(leg, leg.account.user_id) for leg in legs])
+        invalidate_users([source.user_id, destination.user_id])
+        publish_balances({source.pk: source.user_id, destination.pk: destination.user_id})
+    return legs
+
+
+# ===================== BALANCE SNAPSHOTS =====================
+def record_snapshots(account_dates):
+    # Upserts today's closing balance for each account; called inside the posting transaction
+    # after the balance UPDATE, so the row lock orders concurrent writers on server databases
+    snapshots = []
+    for chunk in _chunks(account_dates):
+        for account_id, balance in BankAccount.objects.filter(pk__in=chunk).values_list('pk', 'balance'):
+            snapshots.append(BalanceSnapshot(
+                account_id=account_id,
+                day=timezone.localdate(account_dates[account_id]),
+                closing_balance=balance
+            ))
+    BalanceSnapshot.objects.bulk_create(
+        snapshots,
+        update_conflicts=True,
+        unique_fields=['account', 'day'],
+        update_fields=['closing_balance']
+    )
+
+
+def net_postings(account_id, **date_filters):
+    postings = Transaction.objects.filter(account_id=account_id, **date_filters)
+    return postings.aggregate(net=Sum(signed_amount()))['net'] or Decimal('0.00')
+
+
+def start_of_next_day(day):
+    return timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+
+
+def balance_as_of(account, at):
+    # Reads the nearest snapshot and sums only the postings between it and `at`; snapshots
+    # exist for every day with activity, so the tail is at most one day of postings
+    day = timezone.localdate(at)
+    before = account.snapshots.filter(day__lt=day).order_by('-day').first()
+    if before is not None:
+        return before.closing_balance + net_postings(
+            account.pk, date__gte=start_of_next_day(before.day), date__lte=at
+        )
+
+    after = account.snapshots.filter(day__gte=day).order_by('day').first()
+    if after is not None:
+        return after.closing_balance - net_postings(
+            account.pk, date__gt=at, date__lt=start_of_next_day(after.day)
+        )
+
+    account.refresh_from_db(fields=['balance'])
+    return account.balance - net_postings(account.pk, date__gt=at)
+
+
+def rebuild_snapshots(account_ids=None):
+    # Backfills snapshots from the transaction history in one streaming grouped query per chunk
+    # of accounts (one in total for a full rebuild); the opening balance is whatever the current
+    # balance does not explain
+    if account_ids is None:
+        return _rebuild_snapshots(Transaction.objects.all(), BankAccount.objects.all())
+    written = 0
+    for chunk in _chunks(account_ids):
+        written += _rebuild_snapshots(
+            Transaction.objects.filter(account_id__in=chunk), BankAccount.objects.filter(pk__in=chunk)
+        )
+    return written
+
+
+def _rebuild_snapshots(postings, accounts):
+    totals = dict(postings.values('account_id').annotate(net=Sum(signed_amount())).values_list('account_id', 'net'))
+    balances = dict(accounts.values_list('pk', 'balance'))
+
+    daily = (
+        postings.annotate(day=TruncDate('date'))
+        .values('account_id', 'day')
+        .annotate(net=Sum(signed_amount()))
+        .order_by('account_id', 'day')
+        .values_list('account_id', 'day', 'net')
+    )
+
+    written = 0
+    batch = []
+    running = {}
+    for account_id, day, net in daily.iterator(chunk_size=2000):
+        if account_id not in running:
+            running[account_id] = balances.get(account_id, Decimal('0.00')) - (totals.get(account_id) or 0)
+        running[account_id] += net or 0
+        batch.append(BalanceSnapshot(account_id=account_id, day=day, closing_balance=running[account_id]))
+        if len(batch) >= 2000:
+            written += _upsert_snapshots(batch)
+            batch = []
+    written += _upsert_snapshots(batch)
+    return written
+
+
+def _upsert_snapshots(snapshots):
+    BalanceSnapshot.objects.bulk_create(
+        snapshots,
+        update_conflicts=True,
+        unique_fields=['account', 'day'],
+        update_fields=['closing_balance']
+    )
+    return len(snapshots)
+
+
+# ===================== BATCH POSTING =====================
+BATCH_TYPES = ('deposit', 'withdrawal')
+
+
+def parse_postings(data, file_format='json'):
+    if isinstance(data, bytes):
+        data = data.decode('utf-8-sig')
+
+    if file_format == 'csv':
+        return list(csv.DictReader(io.StringIO(data)))
+
+    if isinstance(data, str):
+        try:
+            data = json.loads(data)
+        except ValueError:
+            raise PostingError('Invalid JSON payload')
+    if isinstance(data, dict):
+        data = data.get('postings')
+    if not isinstance(data, list):
+        raise PostingError('Expected a list of postings')
+    return data
+
+
+def _resolve_accounts(postings):
+    ids = set()
+    numbers = set()
+    for line, posting in enumerate(postings, start=1):
+        if not isinstance(posting, dict):
+            raise PostingError(f'Line {line}: each posting must be an object')
+        if posting.get('account'):
+            ids.add(str(posting['account']))
+        elif posting.get('account_number'):
+            numbers.add(str(posting['account_number']))
+        else:
+            raise PostingError(f'Line {line}: each posting needs an account or account_number')
+
+    by_id = {}
+    by_number = {}
+    owners = {}
+    for chunk in _chunks(ids):
+        try:
+            accounts = list(BankAccount.objects.filter(pk__in=chunk).values_list('pk', 'user_id'))
+        except ValueError:
+            raise PostingError('Account ids must be numbers')
+        for pk, user_id in accounts:
+            by_id[str(pk)] = pk
+            owners[pk] = user_id
+    for chunk in _chunks(numbers):
+        for number, pk, user_id in BankAccount.objects.filter(account_number__in=chunk).values_list(
+            'account_number', 'pk', 'user_id'
+        ):
+            by_number[number] = pk
+            owners[pk] = user_id
+    return by_id, by_number, owners
+
+
+def post_batch(postings, description='Batch posting', allowed_types=BATCH_TYPES):
+    postings = list(postings)
+    by_id, by_number, owners = _resolve_accounts(postings)
+
+    rows = []
+    deltas = defaultdict(Decimal)
+    for line, posting in enumerate(postings, start=1):
+        if posting.get('account'):
+            account_id = by_id.get(str(posting['account']))
+        else:
+            account_id = by_number.get(str(posting['account_number']))
+        if account_id is None:
+            raise PostingError(f'Line {line}: unknown account')
+
+        transaction_type = posting.get('transaction_type')
+        if transaction_type not in allowed_types:
+            raise PostingError(f'Line {line}: invalid transaction_type {transaction_type!r}')
+
+        try:
+            amount = Decimal(str(posting.get('amount')))
+            if not amount.is_finite():
+                raise InvalidOperation
+            amount = amount.quantize(Decimal('0.01'))
+            if len(amount.as_tuple().digits) > AMOUNT_DIGITS:
+                raise InvalidOperation
+        except (InvalidOperation, ValueError):
+            raise PostingError(f'Line {line}: invalid amount')
+        if amount <= 0:
+            raise PostingError(f'Line {line}: amount must be greater than 0')
+
+        rows.append(Transaction(
+            account_id=account_id,
+            transaction_type=transaction_type,
+            amount=amount,
+            description=posting.get('description') or description
+        ))
+        deltas[account_id] += balance_delta(transaction_type, amount)
+
+    # bulk_create skips Transaction.save, so balances are applied once per account below
+    with transaction.atomic():
+        lock_accounts(deltas)
+        Transaction.objects.bulk_create(rows)
+        for account_id, delta in deltas.items():
+            if delta < 0:
+                # Same rule as a single debit: the net withdrawal must be covered, or nothing posts
+                covered = BankAccount.objects.filter(pk=account_id, balance__gte=-delta).update(
+                    balance=F('balance') + delta
+                )
+                if not covered:
+                    raise InsufficientFunds(f'Insufficient balance in account {account_id}')
+            else:
+                apply_balance_delta(account_id, delta)
+        record_snapshots({row.account_id: row.date for row in rows})
+        record_events([posting_event(row, owners[row.account_id]) for row in rows])
+        invalidate_users(owners[account_id] for account_id in deltas)
+        publish_balances({account_id: owners[account_id] for account_id in deltas})
+
+    return {'posted': len(rows), 'accounts': len(deltas)}
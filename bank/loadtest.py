@@ -0,0 +1,242 @@
+import asyncio
+import http.client
+import json
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.test import AsyncClient, Client, override_settings
+
+
+# ===================== LOAD HARNESS =====================
+# Drives the WSGI and ASGI handlers in-process, so both sides get the same process and core
+# budget: WSGI with a pool of worker threads, ASGI with one event loop holding the same number
+# of requests in flight.
+def client_hosts():
+    # The test clients always send Host: testserver
+    return override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'])
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies, errors, elapsed):
+    ordered = sorted(latencies)
+    to_ms = lambda value: None if value is None else round(value * 1000, 2)
+    return {
+        'requests': len(latencies) + errors,
+        'errors': errors,
+        'elapsed_seconds': round(elapsed, 3),
+        'requests_per_second': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'p50_ms': to_ms(percentile(ordered, 0.50)),
+        'p95_ms': to_ms(percentile(ordered, 0.95)),
+        'p99_ms': to_ms(percentile(ordered, 0.99)),
+    }
+
+
+def run_wsgi(paths, cookies, total, concurrency):
+    local = threading.local()
+    latencies = []
+    errors = []
+
+    def client():
+        if not hasattr(local, 'client'):
+            local.client = Client()
+            local.client.cookies = cookies
+        return local.client
+
+    def call(n):
+        started = time.perf_counter()
+        response = client().get(paths[n % len(paths)])
+        if response.status_code == 200:
+            latencies.append(time.perf_counter() - started)
+        else:
+            errors.append(response.status_code)
+
+    started = time.perf_counter()
+    with client_hosts(), ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(call, range(total)))
+    return summarize(latencies, len(errors), time.perf_counter() - started)
+
+
+def run_asgi(paths, cookies, total, concurrency):
+    latencies = []
+    errors = []
+
+    async def main():
+        client = AsyncClient()
+        client.cookies = cookies
+        gate = asyncio.Semaphore(concurrency)
+
+        async def call(n):
+            async with gate:
+                started = time.perf_counter()
+                response = await client.get(paths[n % len(paths)])
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors.append(response.status_code)
+
+        await asyncio.gather(*(call(n) for n in range(total)))
+
+    started = time.perf_counter()
+    with client_hosts():
+        asyncio.run(main())
+    return summarize(latencies, len(errors), time.perf_counter() - started)
+
+
+def login_cookies(user):
+    client = Client()
+    client.force_login(user)
+    return client.cookies
+
+
+# ===================== HTTP REPLAY =====================
+# Replays a weighted mix of customer reads and admin decisions against a running server over
+# keep-alive connections, one per worker thread, and reports latency per endpoint
+CUSTOMER_MIX = (
+    ('user-dashboard', '/api/user/dashboard/', 4),
+    ('user-transactions', '/api/user/transactions/', 4),
+    ('user-accounts', '/api/user/accounts/', 1),
+    ('user-loans', '/api/user/loans/', 1),
+)
+
+
+class HttpClient:
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.https = parts.scheme == 'https'
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip('/')
+        self.conn = None
+
+    def connection(self):
+        if self.conn is None:
+            factory = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            self.conn = factory(self.netloc, timeout=30)
+        return self.conn
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def request(self, method, path, cookie='', payload=None):
+        body = None if payload is None else json.dumps(payload).encode()
+        headers = {'Accept': 'application/json', 'Cookie': cookie}
+        if body is not None:
+            headers['Content-Type'] = 'application/json'
+
+        for attempt in range(2):
+            try:
+                conn = self.connection()
+                conn.request(method, self.prefix + path, body, headers)
+                response = conn.getresponse()
+                return response.status, response.read(), response.headers
+            except (http.client.HTTPException, OSError):
+                # The server closed an idle keep-alive connection; retry once on a fresh one
+                self.close()
+                if attempt:
+                    raise
+
+    def login(self, username, password):
+        status, _, headers = self.request('POST', '/api/login/', payload={'username': username, 'password': password})
+        if status != 200:
+            raise ValueError(f'Login failed for {username} ({status})')
+        cookies = [value.split(';', 1)[0] for value in headers.get_all('Set-Cookie') or ()]
+        return '; '.join(cookies)
+
+
+def pending_ids(client, cookie, path, limit):
+    ids = []
+    cursor = None
+    while len(ids) < limit:
+        query = '?status=pending&page_size=500' + (f'&cursor={cursor}' if cursor else '')
+        status, body, _ = client.request('GET', path + query, cookie)
+        if status != 200:
+            break
+        page = json.loads(body)
+        ids.extend(row['id'] for row in page['results'])
+        cursor = page.get('next_cursor')
+        if not cursor:
+            break
+    return deque(ids[:limit])
+
+
+def replay(base_url, customers, admin, duration, concurrency, admin_share=0.2, seed=None):
+    # customers and admin are (username, password) pairs
+    rng = random.Random(seed)
+    setup = HttpClient(base_url)
+    customer_cookies = [setup.login(*credentials) for credentials in customers]
+    admin_cookie = setup.login(*admin)
+    queues = {
+        'admin-process-request': ('/api/admin/requests/{}/process_request/', pending_ids(setup, admin_cookie, '/api/admin/requests/', 50000)),
+        'admin-process-loan': ('/api/admin/loans/{}/process_loan/', pending_ids(setup, admin_cookie, '/api/admin/loans/', 50000)),
+    }
+    setup.close()
+
+    names = [name for name, _, _ in CUSTOMER_MIX]
+    weights = [weight for _, _, weight in CUSTOMER_MIX]
+    paths = {name: path for name, path, _ in CUSTOMER_MIX}
+    results = defaultdict(lambda: {'latencies': [], 'errors': 0})
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(worker_seed):
+        local_rng = random.Random(worker_seed)
+        client = HttpClient(base_url)
+        while time.perf_counter() < deadline:
+            if local_rng.random() < admin_share:
+                name = local_rng.choice(list(queues))
+                template, ids = queues[name]
+                try:
+                    pk = ids.popleft()
+                except IndexError:
+                    continue
+                method, path, cookie, payload = 'POST', template.format(pk), admin_cookie, {'action': 'approve'}
+            else:
+                name = local_rng.choices(names, weights)[0]
+                method, path, cookie, payload = 'GET', paths[name], local_rng.choice(customer_cookies), None
+
+            started = time.perf_counter()
+            try:
+                status = client.request(method, path, cookie, payload)[0]
+            except OSError:
+                status = 0
+            elapsed = time.perf_counter() - started
+            with lock:
+                if 200 <= status < 300:
+                    results[name]['latencies'].append(elapsed)
+                else:
+                    results[name]['errors'] += 1
+        client.close()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(rng.random(),)) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    endpoints = {name: summarize(result['latencies'], result['errors'], elapsed) for name, result in sorted(results.items())}
+    return {
+        'base_url': base_url,
+        'duration_seconds': duration,
+        'concurrency': concurrency,
+        'admin_share': admin_share,
+        'endpoints': endpoints,
+        'total': summarize(
+            [latency for result in results.values() for latency in result['latencies']],
+            sum(result['errors'] for result in results.values()),
+            elapsed
+        ),
+    }
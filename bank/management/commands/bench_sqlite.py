@@ -0,0 +1,119 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+# Django's stock SQLite connection: rollback journal, deferred transactions, 5s busy timeout
+DEFAULT_PROFILE = {'pragmas': {}, 'begin': 'BEGIN', 'timeout': 5}
+
+
+def tuned_profile():
+    return {'pragmas': settings.SQLITE_PRAGMAS, 'begin': 'BEGIN IMMEDIATE', 'timeout': settings.SQLITE_BUSY_TIMEOUT}
+
+
+def connect(path, profile):
+    conn = sqlite3.connect(path, timeout=profile['timeout'], isolation_level=None, check_same_thread=False)
+    for name, value in profile['pragmas'].items():
+        conn.execute(f'PRAGMA {name}={value}')
+    return conn
+
+
+def prepare(path, accounts):
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute('CREATE TABLE account (id INTEGER PRIMARY KEY, balance NUMERIC NOT NULL)')
+    conn.execute(
+        'CREATE TABLE posting (id INTEGER PRIMARY KEY, account_id INTEGER NOT NULL, amount NUMERIC NOT NULL)'
+    )
+    conn.execute('CREATE INDEX posting_account ON posting (account_id)')
+    conn.executemany('INSERT INTO account (id, balance) VALUES (?, 1000)', [(i,) for i in range(1, accounts + 1)])
+    conn.close()
+
+
+def run_profile(profile, writers, readers, accounts, seconds):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.sqlite3')
+        prepare(path, accounts)
+        counts = {'writes': 0, 'reads': 0, 'locked': 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + seconds
+
+        # Mirrors an approval: read the balance, then post and update inside one transaction
+        def write(worker):
+            conn = connect(path, profile)
+            done = locked = 0
+            n = worker
+            while time.perf_counter() < deadline:
+                account = n % accounts + 1
+                n += writers
+                try:
+                    conn.execute(profile['begin'])
+                    conn.execute('SELECT balance FROM account WHERE id = ?', (account,)).fetchone()
+                    conn.execute('INSERT INTO posting (account_id, amount) VALUES (?, 1)', (account,))
+                    conn.execute('UPDATE account SET balance = balance + 1 WHERE id = ?', (account,))
+                    conn.execute('COMMIT')
+                    done += 1
+                except sqlite3.OperationalError:
+                    locked += 1
+                    if conn.in_transaction:
+                        conn.execute('ROLLBACK')
+            conn.close()
+            with lock:
+                counts['writes'] += done
+                counts['locked'] += locked
+
+        def read(worker):
+            conn = connect(path, profile)
+            done = locked = 0
+            n = worker
+            while time.perf_counter() < deadline:
+                account = n % accounts + 1
+                n += readers
+                try:
+                    conn.execute(
+                        'SELECT COUNT(*), SUM(amount) FROM posting WHERE account_id = ?', (account,)
+                    ).fetchone()
+                    done += 1
+                except sqlite3.OperationalError:
+                    locked += 1
+            conn.close()
+            with lock:
+                counts['reads'] += done
+                counts['locked'] += locked
+
+        threads = [threading.Thread(target=write, args=(i,)) for i in range(writers)]
+        threads += [threading.Thread(target=read, args=(i,)) for i in range(readers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    return {
+        'writes_per_second': round(counts['writes'] / seconds, 1),
+        'reads_per_second': round(counts['reads'] / seconds, 1),
+        'locked_errors': counts['locked'],
+    }
+
+
+class Command(BaseCommand):
+    help = 'Compare concurrent SQLite read/write throughput for the default and tuned connection profiles'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--accounts', type=int, default=100)
+        parser.add_argument('--seconds', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        params = {key: options[key] for key in ('writers', 'readers', 'accounts', 'seconds')}
+        report = {
+            'params': params,
+            'default': run_profile(DEFAULT_PROFILE, **params),
+            'tuned': run_profile(tuned_profile(), **params),
+        }
+        self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,62 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+from bank.outbox import DEFAULT_BATCH_SIZE, consume_batch
+from bank.rollups import ROLLUP_CONSUMER
+
+
+# Consumers that ship with the app and need no --handler
+BUILTIN_HANDLERS = {
+    ROLLUP_CONSUMER: 'bank.rollups.apply_events',
+}
+
+
+class Command(BaseCommand):
+    help = 'Tail the ledger outbox for a named consumer, resuming from its saved sequence number'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', help='Consumer name; its position is kept in OutboxCursor')
+        parser.add_argument('--handler', help='Dotted path to a callable taking a list of OutboxEvent (default: built-in handler or print NDJSON)')
+        parser.add_argument('--topic', action='append', help='Only events with this topic (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--follow', action='store_true', help='Keep polling for new events every --interval seconds')
+        parser.add_argument('--interval', type=float, default=1.0)
+
+    def handle(self, *args, **options):
+        path = options['handler'] or BUILTIN_HANDLERS.get(options['name'])
+        if path:
+            try:
+                handler = import_string(path)
+            except ImportError as exc:
+                raise CommandError(str(exc))
+        else:
+            handler = self.print_events
+
+        consumed = 0
+        while True:
+            count = consume_batch(options['name'], handler, options['batch_size'], options['topic'])
+            consumed += count
+            if count:
+                continue
+            if not options['follow']:
+                break
+            try:
+                time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                break
+
+        self.stderr.write(f'Consumed {consumed} events')
+
+    def print_events(self, events):
+        for event in events:
+            self.stdout.write(json.dumps({
+                'id': event.id,
+                'topic': event.topic,
+                'user': event.user_id,
+                'payload': event.payload,
+                'created_at': event.created_at,
+            }, cls=DjangoJSONEncoder))
@@ -0,0 +1,38 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bank.loadtest import login_cookies, run_asgi, run_wsgi
+from bank.models import User
+
+
+ENDPOINTS = ('dashboard', 'accounts', 'transactions', 'loans')
+
+
+class Command(BaseCommand):
+    help = 'Compare WSGI (sync DRF) and ASGI (async) throughput for the customer read endpoints'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='Customer whose data the requests read')
+        parser.add_argument('--endpoint', action='append', choices=ENDPOINTS, help='Endpoint to hit (repeatable)')
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=50)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['username']}")
+
+        endpoints = options['endpoint'] or ['dashboard']
+        cookies = login_cookies(user)
+        total = options['requests']
+        concurrency = options['concurrency']
+
+        report = {
+            'endpoints': endpoints,
+            'concurrency': concurrency,
+            'wsgi': run_wsgi([f'/api/user/{name}/' for name in endpoints], cookies, total, concurrency),
+            'asgi': run_asgi([f'/api/async/user/{name}/' for name in endpoints], cookies, total, concurrency),
+        }
+        self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,43 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bank.loadtest import replay
+from bank.seeding import SEED_PASSWORD
+
+
+class Command(BaseCommand):
+    help = 'Replay mixed customer and admin traffic against a running server and report per-endpoint latency as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--duration', type=float, default=30.0, help='Seconds to generate load for')
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--admin-share', type=float, default=0.2, help='Fraction of requests that are admin decisions')
+        parser.add_argument('--customers', type=int, default=20, help='Number of seeded customers to log in as')
+        parser.add_argument('--prefix', default='seed', help='Username prefix used by seed_bank')
+        parser.add_argument('--password', default=SEED_PASSWORD)
+        parser.add_argument('--seed', type=int)
+        parser.add_argument('--output', help='Also write the JSON report to this file')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        customers = [(f'{prefix}-user-{n:07d}', options['password']) for n in range(options['customers'])]
+        try:
+            report = replay(
+                options['base_url'],
+                customers,
+                (f'{prefix}-admin', options['password']),
+                duration=options['duration'],
+                concurrency=options['concurrency'],
+                admin_share=options['admin_share'],
+                seed=options['seed']
+            )
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'Load test could not start: {exc}')
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output)
+        self.stdout.write(output)
@@ -0,0 +1,30 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bank.ledger import PostingError, parse_postings, post_batch
+
+
+class Command(BaseCommand):
+    help = 'Post a batch of deposits and withdrawals from a JSON or CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['json', 'csv'], help='Defaults to the file extension')
+        parser.add_argument('--description', default='Batch posting')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f'{path} does not exist')
+        file_format = options['format'] or ('csv' if path.suffix.lower() == '.csv' else 'json')
+
+        try:
+            postings = parse_postings(path.read_bytes(), file_format)
+            result = post_batch(postings, description=options['description'])
+        except PostingError as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Posted {result['posted']} transactions across {result['accounts']} accounts"
+        ))
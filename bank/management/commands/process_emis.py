@@ -0,0 +1,35 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_date
+
+from bank.jobs import DEFAULT_CHUNK_SIZE, EMIWorker, run_emi_job
+
+
+class Command(BaseCommand):
+    help = 'Mark overdue and defaulted EMIs, apply penalties and optionally auto-debit borrowers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Process as of this ISO date (default: today)')
+        parser.add_argument('--debit', action='store_true', help='Auto-debit due EMIs from the borrower account')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--loop', action='store_true', help='Keep running in-process every --interval seconds')
+        parser.add_argument('--interval', type=int, default=3600)
+
+    def handle(self, *args, **options):
+        job_options = {
+            'today': parse_date(options['date']) if options['date'] else None,
+            'debit': options['debit'] or None,
+            'chunk_size': options['chunk_size'],
+        }
+
+        if options['loop']:
+            worker = EMIWorker(interval=options['interval'], **job_options)
+            worker.start()
+            try:
+                worker.join()
+            except KeyboardInterrupt:
+                worker.stop()
+            return
+
+        self.stdout.write(json.dumps(run_emi_job(**job_options), indent=2))
@@ -0,0 +1,12 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from bank.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recompute the analytics rollups from the base tables and reset the "rollups" outbox consumer'
+
+    def handle(self, *args, **options):
+        self.stdout.write(json.dumps(rebuild_rollups(), indent=2))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from bank.ledger import rebuild_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Rebuild daily balance snapshots from the transaction history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--account', type=int, action='append', help='Only this account id (repeatable)')
+
+    def handle(self, *args, **options):
+        written = rebuild_snapshots(options['account'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} balance snapshots'))
@@ -0,0 +1,30 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from bank.seeding import DEFAULT_BATCH_SIZE, BankSeeder
+
+
+class Command(BaseCommand):
+    help = 'Bulk-load synthetic users, accounts, transactions, loans with EMI schedules and pending requests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100000)
+        parser.add_argument('--transactions', type=int, default=1000000)
+        parser.add_argument('--loans', type=int, default=50000)
+        parser.add_argument('--requests', type=int, default=20000)
+        parser.add_argument('--days', type=int, default=365, help='Spread activity over this many past days')
+        parser.add_argument('--prefix', default='seed', help='Username prefix; use a new one to seed again')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--seed', type=int, help='Random seed for a reproducible data set')
+
+    def handle(self, *args, **options):
+        seeder = BankSeeder(
+            prefix=options['prefix'],
+            days=options['days'],
+            batch_size=options['batch_size'],
+            seed=options['seed'],
+            log=lambda message: self.stderr.write(message)
+        )
+        summary = seeder.run(options['users'], options['transactions'], options['loans'], options['requests'])
+        self.stdout.write(json.dumps(summary, indent=2))
@@ -0,0 +1,242 @@
+import heapq
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SLOW_QUERIES_LOGGED = 5
+
+logger = logging.getLogger('bank.slow_requests')
+
+_current = ContextVar('bank_request_stats', default=None)
+
+
+# ===================== PER-REQUEST STATS =====================
+class RequestStats:
+    __slots__ = ('queries', 'db_seconds', 'serializer_seconds', 'serializing', 'slowest')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.serializing = False
+        # (seconds, sql) of the slowest statements, kept only when the slow log is on
+        self.slowest = [] if slow_request_threshold() is not None else None
+
+
+def slow_request_threshold():
+    threshold = getattr(settings, 'BANK_SLOW_REQUEST_MS', None)
+    return threshold / 1000 if threshold else None
+
+
+def record_query(execute, sql, params, many, context):
+    # Installed on every connection; a context variable rather than the thread ties queries to
+    # the request, so async views whose ORM calls hop to a worker thread are counted too
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        stats.queries += 1
+        stats.db_seconds += elapsed
+        if stats.slowest is not None:
+            entry = (elapsed, sql)
+            if len(stats.slowest) < SLOW_QUERIES_LOGGED:
+                heapq.heappush(stats.slowest, entry)
+            elif entry > stats.slowest[0]:
+                heapq.heapreplace(stats.slowest, entry)
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    # connection_created fires on every reconnect of the same wrapper
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class TimedSerializerMixin:
+    # Times the outermost to_representation only, so nested serializers are not counted twice
+    def to_representation(self, instance):
+        stats = _current.get()
+        if stats is None or stats.serializing:
+            return super().to_representation(instance)
+        stats.serializing = True
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            stats.serializer_seconds += time.perf_counter() - started
+            stats.serializing = False
+
+
+# ===================== REGISTRY =====================
+# Per-process totals; every worker exposes its own and Prometheus sums them across scrapes.
+class Series:
+    __slots__ = ('count', 'seconds', 'buckets', 'queries', 'query_buckets', 'db_seconds', 'serializer_seconds', 'statuses')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.queries = 0
+        self.query_buckets = [0] * len(QUERY_BUCKETS)
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.statuses = {}
+
+
+def _observe(buckets, bounds, value):
+    for index, bound in enumerate(bounds):
+        if value <= bound:
+            buckets[index] += 1
+            return
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, view, method, status, seconds, stats):
+        with self._lock:
+            series = self._series.get((view, method))
+            if series is None:
+                series = self._series[(view, method)] = Series()
+            series.count += 1
+            series.seconds += seconds
+            _observe(series.buckets, LATENCY_BUCKETS, seconds)
+            series.queries += stats.queries
+            _observe(series.query_buckets, QUERY_BUCKETS, stats.queries)
+            series.db_seconds += stats.db_seconds
+            series.serializer_seconds += stats.serializer_seconds
+            series.statuses[status] = series.statuses.get(status, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        with self._lock:
+            series = sorted(self._series.items())
+            lines = []
+            _histogram(lines, 'bank_http_request_duration_seconds', 'Request latency by view and method.',
+                       series, LATENCY_BUCKETS, lambda s: (s.buckets, s.seconds))
+            _histogram(lines, 'bank_http_request_db_queries', 'Database queries per request.',
+                       series, QUERY_BUCKETS, lambda s: (s.query_buckets, s.queries))
+
+            lines.append('# HELP bank_http_requests_total Requests by view, method and status.')
+            lines.append('# TYPE bank_http_requests_total counter')
+            for (view, method), s in series:
+                for status, count in sorted(s.statuses.items()):
+                    lines.append(f'bank_http_requests_total{_labels(view=view, method=method, status=status)} {count}')
+
+            for name, help_text, attr in (
+                ('bank_http_request_db_seconds_total', 'Time spent in database queries.', 'db_seconds'),
+                ('bank_http_request_serializer_seconds_total', 'Time spent rendering serializers.', 'serializer_seconds'),
+            ):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} counter')
+                for (view, method), s in series:
+                    lines.append(f'{name}{_labels(view=view, method=method)} {getattr(s, attr):.6f}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def _histogram(lines, name, help_text, series, bounds, pick):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} histogram')
+    for (view, method), s in series:
+        buckets, total = pick(s)
+        cumulative = 0
+        for bound, count in zip(bounds, buckets):
+            cumulative += count
+            lines.append(f'{name}_bucket{_labels(view=view, method=method, le=bound)} {cumulative}')
+        lines.append(f'{name}_bucket{_labels(view=view, method=method, le="+Inf")} {s.count}')
+        lines.append(f'{name}_sum{_labels(view=view, method=method)} {total}')
+        lines.append(f'{name}_count{_labels(view=view, method=method)} {s.count}')
+
+
+registry = MetricsRegistry()
+
+
+# ===================== MIDDLEWARE =====================
+def view_label(request):
+    # URL names keep the label set bounded; paths with ids would not be
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name or match.route
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, time.perf_counter() - started, stats)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, time.perf_counter() - started, stats)
+        return response
+
+    def finish(self, request, response, seconds, stats):
+        # Streaming responses are timed to the first byte, not to the end of the stream
+        view = view_label(request)
+        registry.observe(view, request.method, response.status_code, seconds, stats)
+
+        threshold = slow_request_threshold()
+        if threshold is not None and seconds >= threshold:
+            logger.warning(
+                'Slow request %s %s (%s) %.0fms: %d queries in %.0fms, serializers %.0fms; slowest SQL:\n%s',
+                request.method, request.path, view, seconds * 1000, stats.queries, stats.db_seconds * 1000,
+                stats.serializer_seconds * 1000,
+                '\n'.join(f'  {elapsed * 1000:.1f}ms {sql}' for elapsed, sql in sorted(stats.slowest or (), reverse=True))
+            )
+
+
+# ===================== EXPOSITION =====================
+def metrics_view(request):
+    # Prometheus text format; guarded by a bearer token when BANK_METRICS_TOKEN is set
+    token = getattr(settings, 'BANK_METRICS_TOKEN', '')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponse('Forbidden\n', status=403, content_type='text/plain')
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,53 @@
+# Generated by Django 6.0.2 on 2026-10-18 13:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bank', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='emi',
+            index=models.Index(fields=['status', 'due_date'], name='bank_emi_status_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='emi',
+            index=models.Index(fields=['loan', 'emi_number'], name='bank_emi_loan_number_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['user', 'created_at'], name='bank_loan_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['status', 'created_at'], name='bank_loan_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['created_at'], name='bank_loan_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['account', 'date', 'id'], name='bank_txn_account_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userrequest',
+            index=models.Index(fields=['user', 'created_at'], name='bank_req_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userrequest',
+            index=models.Index(fields=['status', 'created_at'], name='bank_req_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userrequest',
+            index=models.Index(fields=['request_type', 'status', 'created_at'], name='bank_req_type_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userrequest',
+            index=models.Index(fields=['created_at'], name='bank_req_created_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 6.0.2 on 2026-10-18 13:30
+
+from django.db import migrations, models
+
+from bank import amortization
+
+
+def backfill_loan_totals(apps, schema_editor):
+    Loan = apps.get_model('bank', 'Loan')
+    loans = []
+    for loan in Loan.objects.only('id', 'amount', 'interest_rate', 'duration_months').iterator(chunk_size=2000):
+        loan.emi_amount = amortization.calculate_emi(loan.amount, loan.interest_rate, loan.duration_months)
+        loan.total_payable = amortization.total_payable(loan.amount, loan.interest_rate, loan.duration_months)
+        loans.append(loan)
+        if len(loans) == 2000:
+            Loan.objects.bulk_update(loans, ['emi_amount', 'total_payable'])
+            loans = []
+    Loan.objects.bulk_update(loans, ['emi_amount', 'total_payable'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bank', '0002_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loan',
+            name='emi_amount',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='loan',
+            name='total_payable',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=15, null=True),
+        ),
+        migrations.RunPython(backfill_loan_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-18 13:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bank', '0008_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='reference',
+            field=models.CharField(blank=True, db_index=True, max_length=32, null=True),
+        ),
+    ]
@@ -1,7 +1,11 @@
-from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
-import random
+from datetime import timedelta
 from decimal import Decimal
+from django.utils import timezone
+
+from . import amortization
 
 # ===================== USER MODEL =====================
 class User(AbstractUser):
@@ -42,22 +46,22 @@ class BankAccount(models.Model):
         super().save(*args, **kwargs)
     
     def generate_account_number(self):
-        return f"BNK{random.randint(1000000000, 9999999999)}"
+        from .ids import next_id
+
+        return next_id('account')
     
     def __str__(self):
         return f"{self.account_number} - {self.user.username}"
 
 
 # ===================== TRANSACTION MODEL =====================
-from decimal import Decimal
-from django.db import models
-
 class Transaction(models.Model):
     TYPE_CHOICES = (
         ('deposit', 'Deposit'),
         ('withdrawal', 'Withdrawal'),
         ('transfer', 'Transfer'),
         ('loan_disbursement', 'Loan Disbursement'),
+        ('emi_repayment', 'EMI Repayment'),
     )
 
     account = models.ForeignKey('BankAccount', on_delete=models.CASCADE, related_name='transactions')
@@ -65,21 +69,53 @@ class Transaction(models.Model):
     amount = models.DecimalField(max_digits=12, decimal_places=2)
     description = models.TextField(blank=True, null=True)
     date = models.DateTimeField(auto_now_add=True)
+    # Shared by the two legs of a transfer
+    reference = models.CharField(max_length=32, blank=True, null=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['account', 'date', 'id'], name='bank_txn_account_date_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         # Only update balance when creating a new transaction
         if not self.pk:  # new transaction
-            if self.transaction_type == 'deposit':
-                self.account.balance += self.amount
-            elif self.transaction_type == 'withdrawal':
-                self.account.balance -= self.amount
-            self.account.save()  # update bank balance
+            from .ledger import apply_balance_delta, balance_delta, publish_balances, record_snapshots
+            from .outbox import posting_event, record_events
+
+            with transaction.atomic():
+                # The balance UPDATE locks the account row first, so transaction dates follow lock order
+                apply_balance_delta(self.account_id, balance_delta(self.transaction_type, self.amount))
+                # The increment ran in the database; keep the caller's account instance current
+                if Transaction.account.is_cached(self):
+                    self.account.refresh_from_db(fields=['balance'])
+                super().save(*args, **kwargs)
+                record_snapshots({self.account_id: self.date})
+                record_events([posting_event(self, self.account.user_id)])
+                publish_balances({self.account_id: self.account.user_id})
+            return
         super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.transaction_type} - ₹{self.amount} ({self.account.account_number})"
 
 
+# ===================== BALANCE SNAPSHOT MODEL =====================
+class BalanceSnapshot(models.Model):
+    # Closing balance of an account at the end of each day it had activity
+    account = models.ForeignKey(BankAccount, on_delete=models.CASCADE, related_name='snapshots')
+    day = models.DateField()
+    closing_balance = models.DecimalField(max_digits=15, decimal_places=2)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['account', 'day'], name='bank_snapshot_account_day_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.account_id} @ {self.day}: ₹{self.closing_balance}"
+
+
 # ===================== LOAN MODEL =====================
 class Loan(models.Model):
     STATUS_CHOICES = (
@@ -89,6 +125,8 @@ class Loan(models.Model):
         ('disbursed', 'Disbursed'),
         ('completed', 'Completed'),
     )
+    TERM_FIELDS = ('amount', 'interest_rate', 'duration_months')
+
     loan_id = models.CharField(max_length=20, unique=True)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='loans')
     amount = models.DecimalField(max_digits=12, decimal_places=2)
@@ -98,20 +136,64 @@ class Loan(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     approved_date = models.DateTimeField(null=True, blank=True)
     approved_by = models.ForeignKey('User', on_delete=models.SET_NULL, null=True, blank=True, related_name='approved_loans')
+    emi_amount = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, editable=False)
+    total_payable = models.DecimalField(max_digits=15, decimal_places=2, null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='bank_loan_user_created_idx'),
+            models.Index(fields=['status', 'created_at'], name='bank_loan_status_created_idx'),
+            models.Index(fields=['created_at'], name='bank_loan_created_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if set(cls.TERM_FIELDS) <= set(field_names):
+            instance._loaded_terms = instance.terms()
+        return instance
+
+    def terms(self):
+        return tuple(Decimal(getattr(self, name)) for name in self.TERM_FIELDS)
 
     def save(self, *args, **kwargs):
         if not self.loan_id:
-            self.loan_id = f"LOAN{random.randint(100000, 999999)}"
+            from .ids import next_id
+
+            self.loan_id = next_id('loan')
+        # EMI and total payable are derived once per change of terms instead of on every read
+        if self.emi_amount is None or getattr(self, '_loaded_terms', None) != self.terms():
+            self.emi_amount = self.calculate_emi()
+            self.total_payable = amortization.total_payable(self.amount, self.interest_rate, self.duration_months)
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'emi_amount', 'total_payable'}
         super().save(*args, **kwargs)
+        self._loaded_terms = self.terms()
 
     def calculate_emi(self):
-        P = float(self.amount)
-        R = float(self.interest_rate) / (12 * 100)
-        N = self.duration_months
-        if R == 0:
-            return round(P / N, 2)
-        emi = (P * R * (1 + R) ** N) / ((1 + R) ** N - 1)
-        return round(emi, 2)
+        return amortization.calculate_emi(self.amount, self.interest_rate, self.duration_months)
+
+    def build_emi_schedule(self, start_date=None):
+        # Amortization is computed in memory; callers persist the rows with a single bulk_create
+        due_date = (start_date or timezone.now().date()) + timedelta(days=30)
+
+        schedule = []
+        for number, amount, principal, interest in amortization.amortization_schedule(
+            self.amount, self.interest_rate, self.duration_months
+        ):
+            schedule.append(EMI(
+                loan=self,
+                emi_number=number,
+                due_date=due_date,
+                amount=amount,
+                principal=principal,
+                interest=interest,
+                status='pending'
+            ))
+
+            due_date += timedelta(days=30)
+        return schedule
     
     def __str__(self):
         return f"Loan {self.loan_id} - ₹{self.amount}"
@@ -137,6 +219,10 @@ class EMI(models.Model):
     
     class Meta:
         ordering = ['emi_number']
+        indexes = [
+            models.Index(fields=['status', 'due_date'], name='bank_emi_status_due_idx'),
+            models.Index(fields=['loan', 'emi_number'], name='bank_emi_loan_number_idx'),
+        ]
     
     def __str__(self):
         return f"EMI #{self.emi_number} - ₹{self.amount}"
@@ -169,11 +255,113 @@ class UserRequest(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     processed_at = models.DateTimeField(null=True, blank=True)
     processed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='processed_requests')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='bank_req_user_created_idx'),
+            models.Index(fields=['status', 'created_at'], name='bank_req_status_created_idx'),
+            models.Index(fields=['request_type', 'status', 'created_at'], name='bank_req_type_status_idx'),
+            models.Index(fields=['created_at'], name='bank_req_created_idx'),
+        ]
     
     def save(self, *args, **kwargs):
         if not self.request_id:
-            self.request_id = f"REQ{random.randint(100000, 999999)}"
-        super().save(*args, **kwargs)
+            from .ids import next_id
+
+            self.request_id = next_id('request')
+        if self.pk:
+            super().save(*args, **kwargs)
+            return
+
+        from .outbox import record_event
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            record_event('request.created', {
+                'request_id': self.request_id,
+                'request_type': self.request_type,
+                'amount': self.amount,
+            }, self.user_id)
     
     def __str__(self):
         return f"{self.request_id} - {self.request_type}"
+
+
+# ===================== ID SEQUENCE MODEL =====================
+class IdSequence(models.Model):
+    name = models.CharField(max_length=30, primary_key=True)
+    next_value = models.BigIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.name} -> {self.next_value}"
+
+
+# ===================== JOB CHECKPOINT MODEL =====================
+class JobCheckpoint(models.Model):
+    # Progress marker so batch jobs resume where a crashed run stopped
+    name = models.CharField(max_length=50, primary_key=True)
+    run_date = models.DateField()
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} {self.run_date} @ {self.last_id}"
+
+
+# ===================== OUTBOX MODELS =====================
+class OutboxEvent(models.Model):
+    # Ledger and approval changes, written in the same transaction as the change itself;
+    # the id is the sequence number consumers tail by
+    id = models.BigAutoField(primary_key=True)
+    topic = models.CharField(max_length=50)
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"#{self.id} {self.topic}"
+
+
+class OutboxCursor(models.Model):
+    # Last sequence number each named consumer has processed
+    name = models.CharField(max_length=50, primary_key=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.position}"
+
+
+# ===================== ANALYTICS ROLLUP MODEL =====================
+class DailyRollup(models.Model):
+    # Per-day totals maintained from the outbox, so reports never scan the base tables
+    day = models.DateField()
+    metric = models.CharField(max_length=30)
+    account_type = models.CharField(max_length=10, blank=True, default='')
+    category = models.CharField(max_length=30, blank=True, default='')
+    count = models.BigIntegerField(default=0)
+    amount = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['metric', 'day', 'account_type', 'category'], name='bank_rollup_metric_day_uniq'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.metric} {self.day} {self.account_type}/{self.category}: {self.count}"
+
+
+# ===================== REFRESH TOKEN MODEL =====================
+class RefreshToken(models.Model):
+    # Server-side record of each issued refresh token, so it can be rotated and revoked;
+    # access tokens are never stored
+    jti = models.CharField(max_length=32, primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='refresh_tokens')
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    revoked_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.user_id}:{self.jti}"
@@ -0,0 +1,72 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxCursor, OutboxEvent
+
+
+DEFAULT_BATCH_SIZE = 500
+
+
+# ===================== WRITING =====================
+# Called inside the posting/approval transaction, so an event exists exactly when its change does
+def outbox_event(topic, payload, user_id=None):
+    return OutboxEvent(topic=topic, user_id=user_id, payload=payload)
+
+
+def posting_event(entry, user_id):
+    return outbox_event('transaction.posted', {
+        'transaction_id': entry.pk,
+        'account': entry.account_id,
+        'transaction_type': entry.transaction_type,
+        'amount': entry.amount,
+        'date': entry.date,
+        'reference': entry.reference,
+    }, user_id)
+
+
+def record_events(events):
+    OutboxEvent.objects.bulk_create(events)
+
+
+def record_event(topic, payload, user_id=None):
+    record_events([outbox_event(topic, payload, user_id)])
+
+
+# ===================== READING =====================
+def pending_events(after=0, limit=DEFAULT_BATCH_SIZE, topics=None):
+    # Sequence numbers are handed out before commit, so a slow writer can commit a lower number
+    # after a higher one is visible; events younger than the settle window are left for the next
+    # read so the tail never steps over them
+    settle = getattr(settings, 'BANK_OUTBOX_SETTLE_SECONDS', 5)
+    queryset = OutboxEvent.objects.filter(id__gt=after)
+    if settle:
+        queryset = queryset.filter(created_at__lte=timezone.now() - timedelta(seconds=settle))
+    if topics:
+        queryset = queryset.filter(topic__in=topics)
+    return list(queryset.order_by('id')[:limit])
+
+
+def consume_batch(name, handler, batch_size=DEFAULT_BATCH_SIZE, topics=None):
+    # The handler runs in the same transaction that advances the cursor: database side effects
+    # are applied exactly once, anything external at least once
+    with transaction.atomic():
+        cursor, _ = OutboxCursor.objects.select_for_update().get_or_create(name=name)
+        events = pending_events(cursor.position, batch_size, topics)
+        if not events:
+            return 0
+        handler(events)
+        cursor.position = events[-1].id
+        cursor.save(update_fields=['position', 'updated_at'])
+    return len(events)
+
+
+def drain(name, handler, batch_size=DEFAULT_BATCH_SIZE, topics=None):
+    consumed = 0
+    while True:
+        count = consume_batch(name, handler, batch_size, topics)
+        if not count:
+            return consumed
+        consumed += count
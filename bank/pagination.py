@@ -0,0 +1,117 @@
+import base64
+import json
+from functools import reduce
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+# ===================== KEYSET PAGINATION =====================
+class KeysetCursorPagination(BasePagination):
+    # Each page is fetched with "WHERE (ordering) < (last row seen) LIMIT n", so deep pages cost
+    # the same as the first one and rows inserted ahead of the cursor never shift later pages.
+    # The last ordering field must be unique.
+    ordering = ('-id',)
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page = self.page_queryset(queryset, request)
+        return self.finish_page(list(page))
+
+    async def apaginate_queryset(self, queryset, request):
+        page = self.page_queryset(queryset, request)
+        return self.finish_page([row async for row in page])
+
+    def page_queryset(self, queryset, request):
+        self.request = request
+        self.fields = [queryset.model._meta.get_field(name.lstrip('-')) for name in self.ordering]
+        self.current_page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.after(position))
+        return queryset[:self.current_page_size + 1]
+
+    def finish_page(self, rows):
+        self.next_position = None
+        if len(rows) > self.current_page_size:
+            rows = rows[:self.current_page_size]
+            self.next_position = [field.value_from_object(rows[-1]) for field in self.fields]
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def after(self, position):
+        # Lexicographic "row comes after position": (a < x) OR (a = x AND b < y) OR ...
+        clauses = []
+        for depth, name in enumerate(self.ordering):
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            ties = {field.name: value for field, value in zip(self.fields[:depth], position)}
+            ties[f'{self.fields[depth].name}__{lookup}'] = position[depth]
+            clauses.append(Q(**ties))
+        return reduce(lambda left, right: left | right, clauses)
+
+    def encode_cursor(self, position):
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in position]
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            if len(values) != len(self.fields):
+                raise ValueError
+            return [field.to_python(value) for field, value in zip(self.fields, values)]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_paginated_data(self, data):
+        next_cursor = None
+        next_url = None
+        if self.next_position is not None:
+            next_cursor = self.encode_cursor(self.next_position)
+            next_url = replace_query_param(
+                self.request.build_absolute_uri(), self.cursor_query_param, next_cursor
+            )
+        return {
+            'next': next_url,
+            'next_cursor': next_cursor,
+            'results': data
+        }
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'next_cursor': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+
+class TransactionCursorPagination(KeysetCursorPagination):
+    ordering = ('-date', '-id')
+
+
+class CreatedAtCursorPagination(KeysetCursorPagination):
+    ordering = ('-created_at', '-id')
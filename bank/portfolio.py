@@ -0,0 +1,123 @@
+import math
+
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is only needed for portfolio-wide simulation
+    np = None
+
+from .models import Loan
+
+
+DEFAULT_CHUNK_SIZE = 10000
+
+
+def require_numpy():
+    if np is None:
+        raise ImproperlyConfigured('Portfolio simulation requires NumPy (pip install numpy)')
+
+
+# ===================== LOAN BOOK =====================
+def load_loan_book(queryset=None):
+    require_numpy()
+    queryset = Loan.objects.all() if queryset is None else queryset
+    rows = list(queryset.order_by('pk').values_list('pk', 'amount', 'interest_rate', 'duration_months'))
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0), np.empty(0), np.empty(0, dtype=np.int64)
+    ids, amounts, rates, months = zip(*rows)
+    return (
+        np.array(ids, dtype=np.int64),
+        np.array(amounts, dtype=np.float64),
+        np.array(rates, dtype=np.float64),
+        np.array(months, dtype=np.int64),
+    )
+
+
+# ===================== VECTORIZED AMORTIZATION =====================
+def vector_emi(principal, interest_rate, duration_months):
+    require_numpy()
+    rate = np.asarray(interest_rate, dtype=np.float64) / 1200
+    principal = np.asarray(principal, dtype=np.float64)
+    months = np.asarray(duration_months, dtype=np.float64)
+
+    growth = np.power(1 + rate, months)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        annuity = principal * rate * growth / (growth - 1)
+    return np.round(np.where(rate == 0, principal / months, annuity), 2)
+
+
+def vector_schedule(principal, interest_rate, duration_months, emi=None):
+    # Returns (emi, interest, principal_paid, balance), the last three shaped (loans, max tenor).
+    # Balances use the closed form B_k = P(1+r)^k - E((1+r)^k - 1) / r, so no month depends on a
+    # Python-level loop; months past a loan's tenor are zero.
+    require_numpy()
+    principal = np.asarray(principal, dtype=np.float64)
+    rate = np.asarray(interest_rate, dtype=np.float64) / 1200
+    months = np.asarray(duration_months, dtype=np.int64)
+    if emi is None:
+        emi = vector_emi(principal, interest_rate, months)
+
+    steps = np.arange(0, int(months.max(initial=0)) + 1, dtype=np.float64)
+    growth = np.power(1 + rate[:, None], steps[None, :])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        balance = np.where(
+            rate[:, None] == 0,
+            principal[:, None] - emi[:, None] * steps[None, :],
+            principal[:, None] * growth - emi[:, None] * (growth - 1) / rate[:, None],
+        )
+
+    active = steps[None, 1:] <= months[:, None]
+    balance = np.where(steps[None, :] <= months[:, None], np.maximum(balance, 0), 0)
+    interest = np.where(active, balance[:, :-1] * rate[:, None], 0)
+    principal_paid = np.where(active, balance[:, :-1] - balance[:, 1:], 0)
+
+    # The final instalment clears whatever the rounded EMI left outstanding
+    last = months - 1
+    rows = np.arange(len(months))
+    principal_paid[rows, last] = balance[rows, last]
+    balance[rows, last + 1] = 0
+    return emi, interest, principal_paid, balance[:, 1:]
+
+
+# ===================== REPRICING =====================
+# Annual rate change in percentage points; anything wider is a typo, not a scenario
+MAX_RATE_SHIFT = 50.0
+
+
+def check_rate_shift(rate_shift, interest_rate):
+    # Raises ValueError for NaN/inf, out-of-range shifts and shifts that push any loan below 0%
+    if not math.isfinite(rate_shift) or abs(rate_shift) > MAX_RATE_SHIFT:
+        raise ValueError(f'rate_shift must be between -{MAX_RATE_SHIFT:g} and {MAX_RATE_SHIFT:g}')
+    if len(interest_rate) and float(np.min(interest_rate)) + rate_shift < 0:
+        raise ValueError('rate_shift would make a loan rate negative')
+
+
+def reprice(principal, interest_rate, duration_months, rate_shift=0.0, horizon=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    # Scenario analysis over the whole book, processed in chunks so memory stays bounded
+    require_numpy()
+    principal = np.asarray(principal, dtype=np.float64)
+    shifted = np.maximum(np.asarray(interest_rate, dtype=np.float64) + rate_shift, 0)
+    months = np.asarray(duration_months, dtype=np.int64)
+
+    emis = np.empty(len(principal))
+    total_interest = 0.0
+    outstanding = 0.0
+    for start in range(0, len(principal), chunk_size):
+        window = slice(start, start + chunk_size)
+        emi, interest, _, balance = vector_schedule(principal[window], shifted[window], months[window])
+        emis[window] = emi
+        total_interest += float(interest.sum())
+        if horizon:
+            column = min(horizon, balance.shape[1]) - 1
+            outstanding += float(balance[:, column].sum()) if column >= 0 else float(principal[window].sum())
+
+    return {
+        'loans': int(len(principal)),
+        'rate_shift': rate_shift,
+        'horizon_months': horizon,
+        'total_principal': round(float(principal.sum()), 2),
+        'total_monthly_emi': round(float(emis.sum()), 2),
+        'total_interest': round(total_interest, 2),
+        'outstanding_at_horizon': round(outstanding, 2) if horizon else None,
+    }, emis
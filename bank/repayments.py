@@ -0,0 +1,72 @@
+from django.db import transaction
+from django.utils import timezone
+
+from .ledger import PostingError, post_covered_debit
+from .models import EMI, Loan
+
+
+REPAYABLE_LOAN_STATUSES = ('approved', 'disbursed')
+OPEN_EMI_STATUSES = ('pending', 'overdue', 'defaulted')
+
+
+class RepaymentError(ValueError):
+    pass
+
+
+# ===================== LOAN COMPLETION =====================
+def complete_paid_loans(loan_ids):
+    open_loans = EMI.objects.filter(loan_id__in=loan_ids, status__in=OPEN_EMI_STATUSES).values('loan_id')
+    return Loan.objects.filter(pk__in=loan_ids).exclude(pk__in=open_loans).update(status='completed')
+
+
+# ===================== REPAYMENT =====================
+def repay_loan(loan, account, instalments=1, today=None):
+    # Pays the next `instalments` open EMIs (prepaying future ones when more than one) from
+    # `account`, all or nothing
+    if loan.status not in REPAYABLE_LOAN_STATUSES:
+        raise RepaymentError(f'Loan is {loan.status}')
+    if instalments < 1:
+        raise RepaymentError('instalments must be at least 1')
+    today = today or timezone.localdate()
+
+    with transaction.atomic():
+        # One extra row tells us whether this payment clears the loan, without a second query
+        emis = list(
+            EMI.objects.filter(loan=loan, status__in=OPEN_EMI_STATUSES)
+            .order_by('emi_number')
+            .values('id', 'emi_number', 'amount', 'penalty')[:instalments + 1]
+        )
+        if not emis:
+            raise RepaymentError('Loan has no outstanding EMIs')
+        clears_loan = len(emis) <= instalments
+        emis = emis[:instalments]
+        total = sum(emi['amount'] + emi['penalty'] for emi in emis)
+        numbers = [emi['emi_number'] for emi in emis]
+
+        try:
+            post_covered_debit(
+                account,
+                total,
+                transaction_type='emi_repayment',
+                description=f"EMI repayment {loan.loan_id} #{numbers[0]}" + (f"-{numbers[-1]}" if len(numbers) > 1 else '')
+            )
+        except PostingError as exc:
+            raise RepaymentError(str(exc))
+
+        # The status filter makes a concurrent payment of the same EMIs roll this one back
+        paid = EMI.objects.filter(pk__in=[emi['id'] for emi in emis], status__in=OPEN_EMI_STATUSES).update(
+            status='paid', paid_date=today
+        )
+        if paid != len(emis):
+            raise RepaymentError('EMIs were settled concurrently, please retry')
+
+        if clears_loan:
+            loan.status = 'completed'
+            Loan.objects.filter(pk=loan.pk).update(status='completed')
+
+    return {
+        'loan_id': loan.loan_id,
+        'paid_emis': numbers,
+        'amount': total,
+        'loan_status': loan.status,
+    }
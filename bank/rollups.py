@@ -0,0 +1,211 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Case, CharField, Count, F, Max, Sum, Value, When
+from django.db.models.functions import Abs, TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import BankAccount, DailyRollup, Loan, OutboxCursor, OutboxEvent, Transaction, UserRequest
+
+
+ROLLUP_CONSUMER = 'rollups'
+ROLLUP_TOPICS = ('transaction.posted', 'loan.processed', 'request.created', 'request.processed')
+
+TRANSACTIONS = 'transactions'
+LOANS = 'loans'
+REQUESTS_CREATED = 'requests.created'
+REQUESTS_PROCESSED = 'requests.processed'
+
+DEFAULT_REPORT_DAYS = 30
+
+
+def _day(value):
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    return timezone.localdate(value) if timezone.is_aware(value) else value.date()
+
+
+def posting_category(transaction_type, amount):
+    # Transfer legs are signed; volumes are reported per direction
+    if transaction_type == 'transfer':
+        return 'transfer_out' if Decimal(amount) < 0 else 'transfer_in'
+    return transaction_type
+
+
+def _add(totals, key, count, amount):
+    totals[key][0] += count
+    totals[key][1] += Decimal(amount or 0)
+
+
+# ===================== INCREMENTAL UPDATE =====================
+def apply_events(events):
+    # Outbox handler (consumer "rollups"): runs inside the cursor's transaction, so each event is
+    # counted exactly once
+    totals = defaultdict(lambda: [0, Decimal('0')])
+    account_ids = {event.payload['account'] for event in events if event.topic == 'transaction.posted'}
+    account_types = dict(BankAccount.objects.filter(pk__in=account_ids).values_list('pk', 'account_type'))
+
+    for event in events:
+        payload = event.payload
+        if event.topic == 'transaction.posted':
+            category = posting_category(payload['transaction_type'], payload['amount'])
+            key = (TRANSACTIONS, _day(payload['date']), account_types.get(payload['account'], ''), category)
+            _add(totals, key, 1, abs(Decimal(payload['amount'])))
+        elif event.topic == 'loan.processed':
+            _add(totals, (LOANS, _day(event.created_at), '', payload['status']), 1, payload.get('amount'))
+        elif event.topic == 'request.created':
+            _add(totals, (REQUESTS_CREATED, _day(event.created_at), '', payload['request_type']), 1, payload.get('amount'))
+        elif event.topic == 'request.processed':
+            # A request counts once, on the day of its latest decision (processed_at); a later
+            # decision moves it from the previous decision's day
+            day = _day(payload.get('processed_at') or event.created_at)
+            key = (REQUESTS_PROCESSED, day, '', payload['request_type'])
+            if payload.get('previous_status') == 'pending':
+                _add(totals, key, 1, 0)
+            elif payload.get('previous_processed_at'):
+                previous_day = _day(payload['previous_processed_at'])
+                if previous_day != day:
+                    _add(totals, (REQUESTS_PROCESSED, previous_day, '', payload['request_type']), -1, 0)
+                    _add(totals, key, 1, 0)
+
+    merge_totals(totals)
+
+
+def merge_totals(totals):
+    if not totals:
+        return
+    # One read of the touched rows and one upsert per batch
+    existing = DailyRollup.objects.filter(
+        metric__in={key[0] for key in totals},
+        day__in={key[1] for key in totals}
+    )
+    for row in existing:
+        key = (row.metric, row.day, row.account_type, row.category)
+        if key in totals:
+            _add(totals, key, row.count, row.amount)
+
+    DailyRollup.objects.bulk_create(
+        [
+            DailyRollup(metric=metric, day=day, account_type=account_type, category=category, count=count, amount=amount)
+            for (metric, day, account_type, category), (count, amount) in totals.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['metric', 'day', 'account_type', 'category'],
+        update_fields=['count', 'amount']
+    )
+
+
+# ===================== BACKFILL =====================
+def _repeatable_read():
+    # Must run first in the transaction. PostgreSQL reads each statement from a fresh snapshot
+    # under its default READ COMMITTED; InnoDB and SQLite already keep one per transaction
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+
+
+def rebuild_rollups():
+    # Recomputes every rollup from the base tables and moves the consumer past the events
+    # already reflected in them. The cursor position and the aggregates are read from one
+    # snapshot, so an event committed mid-rebuild is either in both or in neither; holding the
+    # cursor row keeps the consumer out until the new rollups are committed
+    totals = defaultdict(lambda: [0, Decimal('0')])
+    with transaction.atomic():
+        _repeatable_read()
+        cursor, _ = OutboxCursor.objects.select_for_update().get_or_create(name=ROLLUP_CONSUMER)
+        position = OutboxEvent.objects.aggregate(last=Max('id'))['last'] or 0
+
+        postings = (
+            Transaction.objects
+            .annotate(
+                day=TruncDate('date'),
+                category=Case(
+                    When(transaction_type='transfer', amount__lt=0, then=Value('transfer_out')),
+                    When(transaction_type='transfer', then=Value('transfer_in')),
+                    default=F('transaction_type'),
+                    output_field=CharField()
+                )
+            )
+            .values('day', 'account__account_type', 'category')
+            .annotate(count=Count('id'), volume=Sum(Abs('amount')))
+            .order_by()
+        )
+        for row in postings:
+            _add(totals, (TRANSACTIONS, row['day'], row['account__account_type'], row['category']), row['count'], row['volume'])
+
+        loans = (
+            Loan.objects.filter(approved_date__isnull=False)
+            .annotate(
+                day=TruncDate('approved_date'),
+                decision=Case(When(status='rejected', then=Value('rejected')), default=Value('approved'), output_field=CharField())
+            )
+            .values('day', 'decision')
+            .annotate(count=Count('id'), volume=Sum('amount'))
+            .order_by()
+        )
+        for row in loans:
+            _add(totals, (LOANS, row['day'], '', row['decision']), row['count'], row['volume'])
+
+        created = (
+            UserRequest.objects.annotate(day=TruncDate('created_at'))
+            .values('day', 'request_type')
+            .annotate(count=Count('id'), volume=Sum('amount'))
+            .order_by()
+        )
+        for row in created:
+            _add(totals, (REQUESTS_CREATED, row['day'], '', row['request_type']), row['count'], row['volume'])
+
+        processed = (
+            UserRequest.objects.filter(processed_at__isnull=False).exclude(status='pending')
+            .annotate(day=TruncDate('processed_at'))
+            .values('day', 'request_type')
+            .annotate(count=Count('id'))
+            .order_by()
+        )
+        for row in processed:
+            _add(totals, (REQUESTS_PROCESSED, row['day'], '', row['request_type']), row['count'], 0)
+
+        DailyRollup.objects.all().delete()
+        merge_totals(totals)
+        cursor.position = position
+        cursor.save(update_fields=['position', 'updated_at'])
+
+    return {'rollups': len(totals), 'outbox_position': position}
+
+
+# ===================== REPORT =====================
+def analytics_report(start, end):
+    # Reads only the rollup table: the cost depends on the number of days, not the ledger size
+    rows = list(
+        DailyRollup.objects.filter(day__range=(start, end)).exclude(count=0)
+        .order_by('metric', 'day', 'account_type', 'category')
+        .values('metric', 'day', 'account_type', 'category', 'count', 'amount')
+    )
+    report = {TRANSACTIONS: [], LOANS: [], 'requests': []}
+    for row in rows:
+        metric = row.pop('metric')
+        row['amount'] = str(row['amount'])
+        if metric == TRANSACTIONS:
+            report[TRANSACTIONS].append(row)
+        elif metric == LOANS:
+            row.pop('account_type')
+            report[LOANS].append(row)
+        else:
+            row.pop('account_type')
+            row.pop('amount')
+            row['event'] = metric.split('.')[1]
+            report['requests'].append(row)
+
+    backlog = defaultdict(int)
+    counts = (
+        DailyRollup.objects.filter(metric__in=(REQUESTS_CREATED, REQUESTS_PROCESSED), day__lte=end)
+        .values('metric', 'category')
+        .annotate(total=Sum('count'))
+        .order_by()
+    )
+    for row in counts:
+        backlog[row['category']] += row['total'] if row['metric'] == REQUESTS_CREATED else -row['total']
+    report['backlog'] = dict(backlog)
+    return report
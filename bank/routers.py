@@ -0,0 +1,78 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+REPLICA_ALIAS = 'replica'
+PRIMARY_ALIAS = 'default'
+
+_replica_reads = ContextVar('bank_replica_reads', default=False)
+
+
+# ===================== REPLICA SELECTION =====================
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+@contextmanager
+def replica_reads():
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+# ===================== READ-YOUR-WRITES =====================
+# A user whose data just changed reads from the primary until the replica has caught up,
+# otherwise a lagging replica could be cached under the freshly bumped version
+def primary_pin_key(user_id):
+    return f'bank:primary-pin:{user_id}'
+
+
+def pin_to_primary(user_ids):
+    if replica_configured():
+        seconds = getattr(settings, 'BANK_REPLICA_LAG_SECONDS', 5)
+        cache.set_many({primary_pin_key(user_id): True for user_id in user_ids}, seconds)
+
+
+def is_pinned(user_id):
+    return cache.get(primary_pin_key(user_id), False)
+
+
+class ReplicaReadMixin:
+    # Safe requests on read-only viewsets are served from the replica. The switch happens only
+    # after authentication, so a session written a moment ago is still read from the primary
+    def dispatch(self, request, *args, **kwargs):
+        token = _replica_reads.set(False)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            _replica_reads.reset(token)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in ('GET', 'HEAD', 'OPTIONS') and replica_configured():
+            if not is_pinned(request.user.pk):
+                _replica_reads.set(True)
+
+
+# ===================== ROUTER =====================
+class PrimaryReplicaRouter:
+    # Writes, migrations and everything outside a replica_reads() block stay on the primary
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and replica_configured():
+            return REPLICA_ALIAS
+        return PRIMARY_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data, so rows read from either may be related
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY_ALIAS
@@ -0,0 +1,216 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import amortization
+from .ids import allocate_ids
+from .ledger import rebuild_snapshots, signed_amount
+from .models import BankAccount, EMI, Loan, Transaction, User, UserRequest
+from .rollups import rebuild_rollups
+
+
+DEFAULT_BATCH_SIZE = 5000
+SEED_PASSWORD = 'seed-pass-123'
+
+
+# ===================== SYNTHETIC DATA =====================
+# Everything is written with bulk_create in fixed-size batches, with ids drawn from the block
+# allocator; the derived state that save() would maintain (balances, snapshots, EMI totals,
+# rollups) is computed in a few set-based statements at the end.
+@contextmanager
+def explicit_timestamps(*fields):
+    # auto_now_add would stamp every seeded row with the current time
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class BankSeeder:
+    def __init__(self, prefix='seed', days=365, batch_size=DEFAULT_BATCH_SIZE, seed=None, log=None):
+        self.prefix = prefix
+        self.days = days
+        self.batch_size = batch_size
+        self.rng = random.Random(seed)
+        self.now = timezone.now()
+        self.log = log or (lambda message: None)
+        self.timings = {}
+
+    def past(self):
+        return self.now - timedelta(seconds=self.rng.randrange(self.days * 86400))
+
+    def step(self, name, func, *args):
+        started = time.perf_counter()
+        result = func(*args)
+        self.timings[name] = round(time.perf_counter() - started, 2)
+        self.log(f'{name}: {self.timings[name]}s')
+        return result
+
+    def bulk(self, model, rows):
+        created = []
+        for batch in _batches(rows, self.batch_size):
+            with transaction.atomic():
+                created.extend(model.objects.bulk_create(batch))
+        return created
+
+    # ---------- users and accounts ----------
+    def create_users(self, count):
+        password = make_password(SEED_PASSWORD)
+        User.objects.get_or_create(
+            username=f'{self.prefix}-admin',
+            defaults={'role': 'admin', 'password': password, 'is_staff': True}
+        )
+        users = (
+            User(username=f'{self.prefix}-user-{n:07d}', password=password, role='user',
+                 email=f'{self.prefix}-user-{n:07d}@example.com')
+            for n in range(count)
+        )
+        return [user.pk for user in self.bulk(User, users)]
+
+    def create_accounts(self, user_ids):
+        numbers = allocate_ids('account', len(user_ids))
+        accounts = (
+            BankAccount(user_id=user_id, account_number=number,
+                        account_type='current' if self.rng.random() < 0.2 else 'savings',
+                        created_at=self.now - timedelta(days=self.days))
+            for user_id, number in zip(user_ids, numbers)
+        )
+        return [(account.pk, account.user_id) for account in self.bulk(BankAccount, accounts)]
+
+    # ---------- ledger ----------
+    def create_transactions(self, accounts, count):
+        # Postings are generated in date order while walking a running balance per account, so
+        # withdrawals never overdraw at any point in the history, not just at the end
+        balances = {pk: Decimal('0') for pk, _ in accounts}
+        account_ids = list(balances)
+        opened = self.now - timedelta(days=self.days)
+        offsets = sorted(self.rng.randrange(self.days * 86400) for _ in range(max(count - len(account_ids), 0)))
+
+        def rows():
+            for pk in account_ids[:count]:
+                opening = Decimal(self.rng.randrange(1000, 50000))
+                balances[pk] += opening
+                yield Transaction(account_id=pk, transaction_type='deposit', amount=opening,
+                                  description='Opening deposit', date=opened)
+            for offset in offsets:
+                pk = self.rng.choice(account_ids)
+                amount = Decimal(self.rng.randrange(100, 500000)) / 100
+                transaction_type = 'withdrawal' if self.rng.random() < 0.45 and balances[pk] >= amount else 'deposit'
+                balances[pk] += amount if transaction_type == 'deposit' else -amount
+                yield Transaction(account_id=pk, transaction_type=transaction_type, amount=amount,
+                                  description=f'Synthetic {transaction_type}', date=opened + timedelta(seconds=offset))
+
+        for batch in _batches(rows(), self.batch_size):
+            with transaction.atomic():
+                Transaction.objects.bulk_create(batch)
+
+    def settle_balances(self, account_ids):
+        # One set-based UPDATE per batch of accounts instead of a per-posting increment
+        total = (
+            Transaction.objects.filter(account=OuterRef('pk'))
+            .values('account')
+            .annotate(total=Sum(signed_amount()))
+            .values('total')
+        )
+        for batch in _batches(account_ids, self.batch_size):
+            BankAccount.objects.filter(pk__in=batch).update(balance=Coalesce(Subquery(total), Decimal('0')))
+        # A full rebuild is one grouped query; passing 100k+ ids would only split it into chunks
+        rebuild_snapshots()
+
+    # ---------- loans and requests ----------
+    def create_loans(self, accounts, count):
+        loan_ids = allocate_ids('loan', count)
+        statuses = ['approved'] * 6 + ['pending'] * 3 + ['rejected']
+
+        def rows():
+            for loan_id in loan_ids:
+                _, user_id = self.rng.choice(accounts)
+                amount = Decimal(self.rng.randrange(10, 500) * 1000)
+                rate = Decimal(self.rng.choice(('8.50', '10.00', '12.00', '14.50')))
+                months = self.rng.choice((6, 12, 24, 36, 60))
+                status = self.rng.choice(statuses)
+                created_at = self.past()
+                yield Loan(
+                    loan_id=loan_id, user_id=user_id, amount=amount, interest_rate=rate, duration_months=months,
+                    status=status, created_at=created_at,
+                    approved_date=None if status == 'pending' else created_at + timedelta(days=1),
+                    emi_amount=amortization.calculate_emi(amount, rate, months),
+                    total_payable=amortization.total_payable(amount, rate, months),
+                )
+
+        emis = 0
+        for batch in _batches(rows(), self.batch_size):
+            with transaction.atomic():
+                loans = Loan.objects.bulk_create(batch)
+                schedule = []
+                for loan in loans:
+                    if loan.status == 'approved':
+                        schedule.extend(loan.build_emi_schedule(loan.approved_date.date()))
+                EMI.objects.bulk_create(schedule, batch_size=self.batch_size)
+                emis += len(schedule)
+        return emis
+
+    def create_requests(self, accounts, count):
+        request_ids = allocate_ids('request', count)
+        types = ['deposit'] * 5 + ['withdrawal'] * 3 + ['account_issue', 'other']
+
+        def rows():
+            for request_id in request_ids:
+                account_id, user_id = self.rng.choice(accounts)
+                request_type = self.rng.choice(types)
+                yield UserRequest(
+                    request_id=request_id, user_id=user_id, account_id=account_id, request_type=request_type,
+                    amount=Decimal(self.rng.randrange(100, 20000)) if request_type in ('deposit', 'withdrawal') else None,
+                    description=f'Synthetic {request_type} request', status='pending', created_at=self.past()
+                )
+
+        self.bulk(UserRequest, rows())
+
+    def run(self, users, transactions, loans, requests):
+        with explicit_timestamps(
+            Transaction._meta.get_field('date'),
+            BankAccount._meta.get_field('created_at'),
+            Loan._meta.get_field('created_at'),
+            UserRequest._meta.get_field('created_at'),
+        ):
+            user_ids = self.step('users', self.create_users, users)
+            accounts = self.step('accounts', self.create_accounts, user_ids)
+            self.step('transactions', self.create_transactions, accounts, transactions)
+            self.step('balances', self.settle_balances, [pk for pk, _ in accounts])
+            emis = self.step('loans', self.create_loans, accounts, loans)
+            self.step('requests', self.create_requests, accounts, requests)
+        self.step('rollups', rebuild_rollups)
+
+        return {
+            'users': len(user_ids),
+            'accounts': len(accounts),
+            'transactions': transactions,
+            'loans': loans,
+            'emis': emis,
+            'requests': requests,
+            'admin': f'{self.prefix}-admin',
+            'password': SEED_PASSWORD,
+            'seconds': self.timings,
+        }
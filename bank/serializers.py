@@ -1,10 +1,26 @@
 from rest_framework import serializers
 from django.contrib.auth.hashers import make_password
-from .models import User, BankAccount, Transaction, Loan, EMI, UserRequest
+from .models import User, BankAccount, Transaction, Loan, EMI, UserRequest, OutboxEvent
+from .metrics import TimedSerializerMixin
+
+
+# ===================== EAGER LOADING =====================
+class EagerLoadingMixin:
+    # Relations read by the serializer fields, joined up front so listing n rows costs one query
+    select_related_fields = ()
+    prefetch_related_fields = ()
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        if cls.select_related_fields:
+            queryset = queryset.select_related(*cls.select_related_fields)
+        if cls.prefetch_related_fields:
+            queryset = queryset.prefetch_related(*cls.prefetch_related_fields)
+        return queryset
 
 
 # ===================== USER SERIALIZER =====================
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, EagerLoadingMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['username', 'password', 'first_name', 'email', 'phone', 'role']
@@ -26,7 +42,8 @@ class UserSerializer(serializers.ModelSerializer):
 
 
 # ===================== BANK ACCOUNT SERIALIZER =====================
-class BankAccountSerializer(serializers.ModelSerializer):
+class BankAccountSerializer(TimedSerializerMixin, EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ('user',)
     user_name = serializers.CharField(source='user.username', read_only=True)
 
     class Meta:
@@ -36,18 +53,17 @@ class BankAccountSerializer(serializers.ModelSerializer):
 
 
 # ===================== TRANSACTION SERIALIZER =====================
-class TransactionSerializer(serializers.ModelSerializer):
+class TransactionSerializer(TimedSerializerMixin, EagerLoadingMixin, serializers.ModelSerializer):
     class Meta:
         model = Transaction
-        fields = ['id', 'account', 'transaction_type', 'amount', 'date']
+        fields = ['id', 'account', 'transaction_type', 'amount', 'reference', 'date']
         read_only_fields = ['date']
 
 
 # ===================== LOAN SERIALIZER =====================
-class LoanSerializer(serializers.ModelSerializer):
+class LoanSerializer(TimedSerializerMixin, EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ('user',)
     user_name = serializers.CharField(source='user.username', read_only=True)
-    emi_amount = serializers.SerializerMethodField()
-    total_payable = serializers.SerializerMethodField()
 
     class Meta:
         model = Loan
@@ -56,18 +72,18 @@ class LoanSerializer(serializers.ModelSerializer):
             'interest_rate', 'status', 'emi_amount', 'total_payable',
             'created_at', 'approved_date', 'approved_by'
         ]
-        read_only_fields = ['loan_id', 'created_at', 'approved_date', 'approved_by']
+        read_only_fields = ['loan_id', 'emi_amount', 'total_payable', 'created_at', 'approved_date', 'approved_by']
 
-    def get_emi_amount(self, obj):
-        return obj.calculate_emi()
-
-    def get_total_payable(self, obj):
-        emi = obj.calculate_emi()
-        return round(emi * obj.duration_months, 2)
+    def validate_duration_months(self, value):
+        # The EMI divides the principal over the tenor
+        if value < 1:
+            raise serializers.ValidationError('duration_months must be at least 1')
+        return value
 
 
 # ===================== EMI SERIALIZER =====================
-class EMISerializer(serializers.ModelSerializer):
+class EMISerializer(TimedSerializerMixin, EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ('loan',)
     loan_id = serializers.CharField(source='loan.loan_id', read_only=True)
 
     class Meta:
@@ -76,7 +92,8 @@ class EMISerializer(serializers.ModelSerializer):
 
 
 # ===================== USER REQUEST SERIALIZER =====================
-class UserRequestSerializer(serializers.ModelSerializer):
+class UserRequestSerializer(TimedSerializerMixin, EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ('user', 'account')
     user_name = serializers.CharField(source='user.username', read_only=True)
     account_number = serializers.CharField(
         source='account.account_number',
@@ -96,3 +113,15 @@ class UserRequestSerializer(serializers.ModelSerializer):
             'description', 'status', 'admin_note', 'created_at', 'processed_at'
         ]
         read_only_fields = ['request_id', 'created_at', 'processed_at', 'processed_by']
+
+
+# ===================== OUTBOX SERIALIZER =====================
+class OutboxEventSerializer(TimedSerializerMixin, EagerLoadingMixin, serializers.ModelSerializer):
+    class Meta:
+        model = OutboxEvent
+        fields = ['id', 'topic', 'user', 'payload', 'created_at']
+
+
+# ===================== BULK LOAN APPROVAL =====================
+class BulkApproveSerializer(serializers.Serializer):
+    loan_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False)
@@ -0,0 +1,50 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .caching import ADMIN_SCOPE, invalidate_scopes, invalidate_users
+from .metrics import install_query_recorder
+from .tokens import revoke_user_tokens
+from .models import User, BankAccount, EMI, Loan, Transaction, UserRequest
+
+
+# ===================== CACHE INVALIDATION =====================
+@receiver([post_save, post_delete], sender=Transaction)
+def transaction_changed(sender, instance, **kwargs):
+    invalidate_users([instance.account.user_id])
+
+
+@receiver([post_save, post_delete], sender=BankAccount)
+@receiver([post_save, post_delete], sender=Loan)
+@receiver([post_save, post_delete], sender=UserRequest)
+def user_row_changed(sender, instance, **kwargs):
+    invalidate_users([instance.user_id])
+
+
+@receiver([post_save, post_delete], sender=EMI)
+def emi_changed(sender, instance, **kwargs):
+    invalidate_users([instance.loan.user_id])
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, **kwargs):
+    invalidate_scopes([ADMIN_SCOPE])
+
+
+# ===================== TOKEN REVOCATION =====================
+@receiver(post_save, sender=User)
+def user_edited(sender, instance, created, update_fields=None, **kwargs):
+    # Access tokens carry the role, so any edit (role, password, deactivation) ends the user's
+    # token sessions; the last_login stamp written at login does not
+    if created or update_fields == frozenset(['last_login']):
+        return
+    revoke_user_tokens(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    revoke_user_tokens(instance.pk)
+
+
+# ===================== METRICS =====================
+connection_created.connect(install_query_recorder)
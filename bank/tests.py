@@ -1,3 +1,1035 @@
-from django.test import TestCase
+import asyncio
+import csv
+import importlib
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from unittest import skipUnless
 
-# Create your tests here.
+from django.apps import apps
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from . import amortization, portfolio, routers
+from .events import broker
+from .ids import SequenceIdAllocator, format_id, is_valid_id, luhn_check_digit
+from .jobs import auto_debit, run_emi_job
+from .metrics import registry
+from .seeding import BankSeeder, explicit_timestamps
+from .outbox import consume_batch, drain
+from .ledger import PostingError, balance_as_of, parse_postings, rebuild_snapshots, signed_amount
+from .rollups import ROLLUP_CONSUMER, analytics_report, apply_events, rebuild_rollups
+from .models import User, BankAccount, Transaction, Loan, EMI, UserRequest, OutboxEvent, OutboxCursor, JobCheckpoint, BalanceSnapshot, IdSequence
+
+
+# ===================== LEDGER =====================
+class ConcurrentPostingTests(TransactionTestCase):
+    workers = 8
+    postings_per_worker = 25
+
+    def test_parallel_postings_do_not_lose_updates(self):
+        user = User.objects.create_user('stress', password='x')
+        account = BankAccount.objects.create(user=user, balance=Decimal('1000.00'))
+        errors = []
+
+        def post():
+            try:
+                for i in range(self.postings_per_worker):
+                    Transaction.objects.create(
+                        account=account,
+                        transaction_type='deposit' if i % 2 else 'withdrawal',
+                        amount=Decimal('1.00') if i % 2 else Decimal('0.50'),
+                    )
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=post) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        deposits = self.postings_per_worker // 2
+        withdrawals = self.postings_per_worker - deposits
+        expected = Decimal('1000.00') + self.workers * (deposits * Decimal('1.00') - withdrawals * Decimal('0.50'))
+        account.refresh_from_db()
+        self.assertEqual(account.balance, expected)
+        self.assertEqual(Transaction.objects.filter(account=account).count(), self.workers * self.postings_per_worker)
+
+
+
+class BatchPostingTests(TestCase):
+    url = '/api/admin/transactions/batch/'
+
+    def setUp(self):
+        admin = User.objects.create_user('batch-admin', password='x', role='admin')
+        self.customer = User.objects.create_user('batch-user', password='x')
+        self.savings = BankAccount.objects.create(user=self.customer, balance=Decimal('100.00'))
+        self.current = BankAccount.objects.create(user=self.customer, account_type='current')
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+
+    def balances(self):
+        return [BankAccount.objects.get(pk=account.pk).balance for account in (self.savings, self.current)]
+
+    def test_batch_updates_balances_snapshots_and_outbox(self):
+        response = self.client.post(self.url, {'postings': [
+            {'account': self.savings.pk, 'transaction_type': 'withdrawal', 'amount': '40.00'},
+            {'account_number': self.current.account_number, 'transaction_type': 'deposit', 'amount': '25.50'},
+            {'account': self.savings.pk, 'transaction_type': 'deposit', 'amount': '10'},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data, {'posted': 3, 'accounts': 2})
+        self.assertEqual(self.balances(), [Decimal('70.00'), Decimal('25.50')])
+        self.assertEqual(self.savings.snapshots.get().closing_balance, Decimal('70.00'))
+        self.assertEqual(OutboxEvent.objects.filter(topic='transaction.posted').count(), 3)
+
+    def test_invalid_batches_post_nothing(self):
+        for postings, error in (
+            ([{'account': 999999, 'transaction_type': 'deposit', 'amount': '1'}], 'Line 1: unknown account'),
+            ([{'account': self.savings.pk, 'transaction_type': 'deposit', 'amount': 'NaN'}], 'Line 1: invalid amount'),
+            ([{'account': self.savings.pk, 'transaction_type': 'deposit', 'amount': '1e11'}], 'Line 1: invalid amount'),
+            (['not a posting'], 'Line 1: each posting must be an object'),
+            ([{'account': 'abc', 'transaction_type': 'deposit', 'amount': '1'}], 'Account ids must be numbers'),
+            # The deposit is valid, but the overdraft rolls back the whole batch
+            ([{'account': self.current.pk, 'transaction_type': 'deposit', 'amount': '5'},
+              {'account': self.savings.pk, 'transaction_type': 'withdrawal', 'amount': '100.01'}],
+             f'Insufficient balance in account {self.savings.pk}'),
+        ):
+            response = self.client.post(self.url, postings, format='json')
+            self.assertEqual((response.status_code, response.data['error']), (400, error))
+        self.assertEqual(self.balances(), [Decimal('100.00'), Decimal('0.00')])
+        self.assertFalse(Transaction.objects.exists())
+        self.assertFalse(OutboxEvent.objects.exists())
+
+    def test_parse_postings_and_command(self):
+        rows = f'account,transaction_type,amount\n{self.savings.pk},deposit,5.00\n'
+        self.assertEqual(parse_postings(rows.encode(), 'csv'),
+                         [{'account': str(self.savings.pk), 'transaction_type': 'deposit', 'amount': '5.00'}])
+        self.assertEqual(parse_postings('{"postings": [{"account": 1}]}'), [{'account': 1}])
+        with self.assertRaises(PostingError):
+            parse_postings('{"postings": "x"}')
+
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as upload:
+            upload.write(rows)
+        self.addCleanup(os.remove, upload.name)
+        out = io.StringIO()
+        call_command('post_transactions', upload.name, stdout=out)
+        self.assertIn('Posted 1 transactions across 1 accounts', out.getvalue())
+        self.assertEqual(self.balances()[0], Decimal('105.00'))
+
+
+class BalanceSnapshotTests(TestCase):
+    def setUp(self):
+        self.account = BankAccount.objects.create(user=User.objects.create_user('snapshot-user', password='x'))
+
+    def at(self, days_ago, hour):
+        return timezone.make_aware(datetime.combine(timezone.localdate() - timedelta(days=days_ago), time(hour)))
+
+    def test_postings_upsert_the_days_closing_balance(self):
+        Transaction.objects.create(account=self.account, transaction_type='deposit', amount=Decimal('100.00'))
+        Transaction.objects.create(account=self.account, transaction_type='withdrawal', amount=Decimal('30.00'))
+
+        self.assertEqual(self.account.balance, Decimal('70.00'))
+        snapshot = self.account.snapshots.get()
+        self.assertEqual((snapshot.day, snapshot.closing_balance), (timezone.localdate(), Decimal('70.00')))
+
+    def test_rebuilt_history_answers_point_in_time_balances(self):
+        with explicit_timestamps(Transaction._meta.get_field('date')):
+            Transaction.objects.bulk_create([
+                Transaction(account=self.account, transaction_type='deposit', amount=Decimal('100.00'), date=self.at(5, 10)),
+                Transaction(account=self.account, transaction_type='withdrawal', amount=Decimal('20.00'), date=self.at(5, 15)),
+                Transaction(account=self.account, transaction_type='deposit', amount=Decimal('50.00'), date=self.at(3, 12)),
+            ])
+        BankAccount.objects.filter(pk=self.account.pk).update(balance=Decimal('130.00'))
+        other = BankAccount.objects.create(user=User.objects.create_user('snapshot-other', password='x'))
+
+        self.assertEqual(rebuild_snapshots([self.account.pk, other.pk]), 2)
+        self.assertEqual(
+            list(self.account.snapshots.order_by('day').values_list('closing_balance', flat=True)),
+            [Decimal('80.00'), Decimal('130.00')]
+        )
+        for at, expected in (
+            (self.at(6, 12), '0.00'),     # before the first snapshot
+            (self.at(5, 9), '0.00'),      # same day, before its first posting
+            (self.at(5, 12), '100.00'),   # same day, between postings
+            (self.at(4, 12), '80.00'),    # between snapshots
+            (self.at(3, 18), '130.00'),
+            (timezone.now(), '130.00'),
+        ):
+            self.assertEqual(balance_as_of(self.account, at), Decimal(expected))
+
+    def test_impossible_dates_are_rejected(self):
+        client = APIClient()
+        client.force_authenticate(self.account.user)
+        for at in ('2026-13-45', '2026-01-01T25:00:00'):
+            response = client.get(f'/api/user/accounts/{self.account.pk}/balance/', {'at': at})
+            self.assertEqual(
+                (response.status_code, response.data), (400, {'error': 'at must be an ISO date or timestamp'})
+            )
+
+# ===================== QUERY PLANS =====================
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN output is SQLite specific')
+class ListEndpointQueryPlanTests(TestCase):
+    list_endpoints = [
+        ('customer', '/api/user/transactions/'),
+        ('customer', '/api/user/loans/'),
+        ('customer', '/api/userrequest/'),
+        ('admin', '/api/admin/requests/'),
+        ('admin', '/api/admin/requests/?status=pending'),
+        ('admin', '/api/admin/requests/?request_type=deposit&status=pending'),
+        ('admin', '/api/admin/loans/'),
+        ('admin', '/api/admin/loans/?status=pending'),
+    ]
+    # A bare "SCAN <table>" means SQLite walks the whole table; index scans read "SCAN <table> USING ..."
+    full_scan = re.compile(r'^SCAN (bank_\w+)$')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('plan-admin', password='x', role='admin')
+        cls.customer = User.objects.create_user('plan-user', password='x')
+        others = [User.objects.create_user(f'plan-other-{i}', password='x') for i in range(3)]
+        for user in [cls.customer] + others:
+            account = BankAccount.objects.create(user=user)
+            Transaction.objects.bulk_create(
+                Transaction(account=account, transaction_type='deposit', amount=Decimal('10.00'))
+                for _ in range(20)
+            )
+            Loan.objects.create(user=user, amount=Decimal('5000.00'), duration_months=6)
+            UserRequest.objects.bulk_create(
+                UserRequest(user=user, account=account, request_type='deposit', description='x',
+                            amount=Decimal('1.00'), request_id=f'PLAN{user.pk}-{i}')
+                for i in range(10)
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def full_scans(self, role, url):
+        client = APIClient()
+        client.force_authenticate(self.admin if role == 'admin' else self.customer)
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+        scans = []
+        with connection.cursor() as cursor:
+            for query in ctx.captured_queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                scans += [row[3] for row in cursor.fetchall() if self.full_scan.match(row[3])]
+        return scans
+
+    def test_list_endpoints_use_indexes(self):
+        for role, url in self.list_endpoints:
+            with self.subTest(url=url):
+                self.assertEqual(self.full_scans(role, url), [])
+
+
+# ===================== QUERY COUNTS =====================
+class ListEndpointQueryCountTests(TestCase):
+    # (role, url, queries) - the count must not change as rows are added
+    list_endpoints = [
+        ('customer', '/api/user/accounts/', 1),
+        ('customer', '/api/user/transactions/', 1),
+        ('customer', '/api/user/loans/', 1),
+        ('customer', '/api/userrequest/', 1),
+        ('admin', '/api/admin/users/', 1),
+        ('admin', '/api/admin/accounts/', 1),
+        ('admin', '/api/admin/loans/', 1),
+        ('admin', '/api/admin/requests/', 1),
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('count-admin', password='x', role='admin')
+        cls.customer = User.objects.create_user('count-user', password='x')
+        cls.seed(cls.customer, 1)
+
+    def setUp(self):
+        cache.clear()
+
+    @staticmethod
+    def seed(user, count):
+        account = BankAccount.objects.create(user=user)
+        for i in range(count):
+            other = User.objects.create(username=f'count-{user.pk}-{account.pk}-{i}')
+            BankAccount.objects.create(user=other)
+            Transaction.objects.create(account=account, transaction_type='deposit', amount=Decimal('1.00'))
+            Loan.objects.create(user=user, amount=Decimal('1000.00'), duration_months=3)
+            UserRequest.objects.create(user=user, account=account, request_type='deposit',
+                                       amount=Decimal('1.00'), description='x')
+
+    def assertListQueryCount(self, role, url, expected):
+        client = APIClient()
+        client.force_authenticate(self.admin if role == 'admin' else self.customer)
+        with self.assertNumQueries(expected):
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_dashboard_is_built_with_fixed_queries_and_then_cached(self):
+        self.seed(self.customer, 10)
+        client = APIClient()
+        client.force_authenticate(self.customer)
+        with self.assertNumQueries(4):
+            response = client.get('/api/user/dashboard/')
+        self.assertEqual(len(response.data['accounts']), 2)
+        with self.assertNumQueries(0):
+            self.assertEqual(client.get('/api/user/dashboard/').data, response.data)
+
+    def test_list_query_count_is_independent_of_row_count(self):
+        for rows in (1, 20):
+            if rows > 1:
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.seed(self.customer, rows)
+            for role, url, expected in self.list_endpoints:
+                with self.subTest(url=url, rows=rows):
+                    self.assertListQueryCount(role, url, expected)
+
+
+
+# ===================== IDENTIFIERS =====================
+class IdAllocationTests(TestCase):
+    def test_ids_are_padded_and_luhn_checked(self):
+        self.assertEqual(luhn_check_digit('7992739871'), '3')
+        identifier = format_id('account', 42)
+        self.assertEqual(identifier, f"BNK0000000042{luhn_check_digit('0000000042')}")
+        self.assertTrue(is_valid_id('account', identifier))
+        self.assertFalse(is_valid_id('account', identifier[:-1] + str((int(identifier[-1]) + 1) % 10)))
+        self.assertFalse(is_valid_id('account', 'BNK42' + luhn_check_digit('42')))
+        self.assertFalse(is_valid_id('loan', identifier))
+
+    def test_blocks_are_reserved_per_sequence(self):
+        allocator = SequenceIdAllocator(block_size=10)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(allocator.allocate('loan'), [format_id('loan', 1)])
+            self.assertEqual(allocator.allocate('request', 3), [format_id('request', n) for n in (1, 2, 3)])
+
+        # Spare values of the committed blocks are served from memory
+        with self.assertNumQueries(0):
+            self.assertEqual(allocator.allocate('loan', 2), [format_id('loan', n) for n in (2, 3)])
+        self.assertEqual(allocator.allocate('loan', 20), [format_id('loan', n) for n in range(11, 31)])
+        self.assertEqual(
+            dict(IdSequence.objects.values_list('name', 'next_value')), {'loan': 31, 'request': 11}
+        )
+
+
+# ===================== STATEMENT EXPORT =====================
+class StatementExportTests(TestCase):
+    def setUp(self):
+        admin = User.objects.create_user('export-admin', password='x', role='admin')
+        self.account = BankAccount.objects.create(user=User.objects.create_user('export-user', password='x'))
+        today = timezone.localdate()
+        with explicit_timestamps(Transaction._meta.get_field('date')):
+            Transaction.objects.bulk_create([
+                Transaction(account=self.account, transaction_type='deposit', amount=Decimal(amount),
+                            date=timezone.make_aware(datetime.combine(today - timedelta(days=days_ago), time(12))))
+                for days_ago, amount in ((10, '100.00'), (5, '20.00'), (1, '3.50'))
+            ])
+        self.start = (today - timedelta(days=5)).isoformat()
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+
+    def export(self, **params):
+        return self.client.get(f'/api/admin/accounts/{self.account.pk}/statement/', params)
+
+    def test_csv_streams_a_header_and_one_line_per_posting(self):
+        response = self.export()
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(
+            response['Content-Disposition'], f'attachment; filename="statement-{self.account.account_number}.csv"'
+        )
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0], ['id', 'account_number', 'transaction_type', 'amount', 'description', 'date'])
+        self.assertEqual([row[3] for row in rows[1:]], ['100.00', '20.00', '3.50'])
+
+    def test_ndjson_honours_the_period(self):
+        response = self.export(output='ndjson', start=self.start, end=self.start)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['amount'] for line in lines], ['20.00'])
+
+        self.assertEqual(self.export(start='yesterday').status_code, 400)
+        self.assertEqual(self.export(output='xml').status_code, 400)
+
+# ===================== PORTFOLIO SIMULATION =====================
+@skipUnless(portfolio.np is not None, 'NumPy is not installed')
+class VectorizedAmortizationTests(TestCase):
+    loans = [
+        ('250000.00', '8.50', 12),
+        ('1200000.00', '9.15', 240),
+        ('4999999.99', '17.99', 360),
+        ('75000.00', '0.00', 36),
+        ('10000.00', '24.00', 7),
+    ]
+
+    def test_vectorized_schedule_matches_decimal_schedule(self):
+        amounts, rates, months = zip(*self.loans)
+        emi, interest, principal_paid, balance = portfolio.vector_schedule(
+            [float(a) for a in amounts], [float(r) for r in rates], list(months)
+        )
+
+        for row, (amount, rate, tenor) in enumerate(self.loans):
+            with self.subTest(amount=amount, rate=rate, tenor=tenor):
+                schedule = list(amortization.amortization_schedule(amount, rate, tenor))
+                self.assertAlmostEqual(float(emi[row]), float(amortization.calculate_emi(amount, rate, tenor)), places=2)
+                for number, _, _, expected_interest in schedule:
+                    self.assertAlmostEqual(interest[row, number - 1], float(expected_interest), delta=0.05)
+                # Per-instalment rounding in the Decimal schedule drifts by at most a paisa a month
+                total_interest = sum(float(item[3]) for item in schedule)
+                self.assertAlmostEqual(interest[row].sum(), total_interest, delta=0.01 * tenor)
+                self.assertAlmostEqual(principal_paid[row].sum(), float(amount), places=2)
+                self.assertEqual(balance[row, tenor - 1], 0)
+
+    def test_reprice_reports_portfolio_totals(self):
+        summary, emis = portfolio.reprice([100000.0, 200000.0], [10.0, 12.0], [12, 24], rate_shift=1.0, horizon=12)
+        self.assertEqual(summary['loans'], 2)
+        self.assertAlmostEqual(emis[0], float(amortization.calculate_emi('100000', '11', 12)), places=2)
+        remaining = list(amortization.amortization_schedule('200000', '13', 24))[12:]
+        self.assertAlmostEqual(summary['outstanding_at_horizon'], float(sum(item[2] for item in remaining)), delta=1)
+
+    def test_reprice_rejects_nonsense_rate_shifts(self):
+        admin = User.objects.create_user('reprice-admin', password='x', role='admin')
+        Loan.objects.create(loan_id='LNREPRICE1', user=admin, amount=Decimal('50000'), interest_rate=Decimal('4.00'))
+        client = APIClient()
+        client.force_authenticate(admin)
+
+        for shift in ('nan', 'inf', '-inf', '75', '-4.5'):
+            with self.subTest(rate_shift=shift):
+                response = client.post('/api/admin/loans/reprice/', {'rate_shift': shift}, format='json')
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(client.post('/api/admin/loans/reprice/', {'rate_shift': '-4'}, format='json').status_code, 200)
+
+
+# ===================== RESPONSE CACHING =====================
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.customer = User.objects.create_user('etag-user', password='x')
+        self.account = BankAccount.objects.create(user=self.customer)
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def test_unchanged_list_returns_304_until_a_posting_commits(self):
+        first = self.client.get('/api/user/accounts/')
+        etag = first['ETag']
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/user/accounts/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Transaction.objects.create(account=self.account, transaction_type='deposit', amount=Decimal('5.00'))
+
+        response = self.client.get('/api/user/accounts/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data[0]['balance'], '5.00')
+
+
+
+# ===================== LOAN TERMS =====================
+class LoanTermsTests(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user('terms-user', password='x')
+        self.loan = Loan.objects.create(
+            user=self.customer, amount=Decimal('12000.00'), duration_months=12, interest_rate=Decimal('12.00')
+        )
+
+    def assertTerms(self, loan):
+        self.assertEqual(loan.emi_amount, amortization.calculate_emi(loan.amount, loan.interest_rate, loan.duration_months))
+        self.assertEqual(loan.total_payable, amortization.total_payable(loan.amount, loan.interest_rate, loan.duration_months))
+
+    def test_terms_are_stored_on_create(self):
+        self.assertTerms(Loan.objects.get(pk=self.loan.pk))
+
+    def test_terms_are_recomputed_when_they_change(self):
+        for field, value in (('amount', Decimal('24000.00')), ('interest_rate', Decimal('9.50')), ('duration_months', 18)):
+            with self.subTest(field=field):
+                loan = Loan.objects.get(pk=self.loan.pk)
+                previous = loan.emi_amount
+                setattr(loan, field, value)
+                loan.save(update_fields=[field])
+                loan = Loan.objects.get(pk=loan.pk)
+                self.assertNotEqual(loan.emi_amount, previous)
+                self.assertTerms(loan)
+
+    def test_status_only_save_leaves_terms_alone(self):
+        # A stale stored value would be overwritten if the save recomputed it
+        Loan.objects.filter(pk=self.loan.pk).update(emi_amount=Decimal('1.00'))
+        loan = Loan.objects.get(pk=self.loan.pk)
+        loan.status = 'approved'
+        with CaptureQueriesContext(connection) as queries:
+            loan.save(update_fields=['status'])
+        self.assertNotIn('emi_amount', queries.captured_queries[-1]['sql'])
+        self.assertEqual(Loan.objects.get(pk=loan.pk).emi_amount, Decimal('1.00'))
+
+    def test_migration_backfills_existing_loans(self):
+        migration = importlib.import_module('bank.migrations.0003_loan_emi_totals')
+        Loan.objects.update(emi_amount=None, total_payable=None)
+        migration.backfill_loan_totals(apps, None)
+        self.assertTerms(Loan.objects.get(pk=self.loan.pk))
+
+    def test_zero_month_tenor_is_rejected(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('terms-admin', password='x', role='admin'))
+        response = client.post('/api/admin/loans/', {
+            'user': self.customer.pk, 'amount': '5000.00', 'duration_months': 0, 'interest_rate': '10.00'
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('duration_months', response.data)
+        with self.assertRaises(ValueError):
+            amortization.calculate_emi('5000', '10', 0)
+
+
+# ===================== LOAN APPROVAL =====================
+class BulkApproveTests(TestCase):
+    def setUp(self):
+        admin = User.objects.create_user('approver', password='x', role='admin')
+        self.customer = User.objects.create_user('applicant', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(admin)
+
+    def loan(self, **fields):
+        return Loan.objects.create(
+            user=self.customer, amount=Decimal('6000.00'), duration_months=7, interest_rate=Decimal('11.50'), **fields
+        )
+
+    def test_pending_loans_are_approved_with_their_schedules(self):
+        pending = [self.loan(), self.loan()]
+        rejected = self.loan(status='rejected')
+
+        response = self.client.post('/api/admin/loans/bulk_approve/',
+                                    {'loan_ids': [pending[0].pk, rejected.pk, pending[1].pk, 999999]}, format='json')
+
+        self.assertEqual(sorted(response.data['approved']), sorted(loan.pk for loan in pending))
+        self.assertEqual(response.data['skipped'], [rejected.pk, 999999])
+        self.assertEqual(response.data['emis_created'], 14)
+        for loan in pending:
+            loan.refresh_from_db()
+            self.assertEqual(loan.status, 'approved')
+            total = EMI.objects.filter(loan=loan).aggregate(total=Sum('amount'))['total']
+            self.assertEqual(total, loan.total_payable)
+
+    def test_malformed_ids_are_rejected(self):
+        for loan_ids in (['x'], [], 'abc', [[1]]):
+            response = self.client.post('/api/admin/loans/bulk_approve/', {'loan_ids': loan_ids}, format='json')
+            self.assertEqual(response.status_code, 400)
+
+# ===================== REPAYMENTS =====================
+class RepaymentTests(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user('borrower', password='x')
+        self.account = BankAccount.objects.create(user=self.customer, balance=Decimal('10000.00'))
+        self.loan = Loan.objects.create(
+            user=self.customer, amount=Decimal('6000.00'), duration_months=4,
+            interest_rate=Decimal('12.00'), status='approved'
+        )
+        EMI.objects.bulk_create(self.loan.build_emi_schedule())
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def repay(self, instalments):
+        return self.client.post(f'/api/user/loans/{self.loan.pk}/repay/', {'instalments': instalments}, format='json')
+
+    def test_prepaying_every_instalment_completes_the_loan(self):
+        self.assertEqual(self.repay(1).data['loan_status'], 'approved')
+        response = self.repay(10)
+
+        self.assertEqual(response.data['paid_emis'], [2, 3, 4])
+        self.assertEqual(response.data['loan_status'], 'completed')
+        self.assertFalse(EMI.objects.filter(loan=self.loan).exclude(status='paid').exists())
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, Decimal('10000.00') - self.loan.total_payable)
+
+    def test_malformed_account_is_rejected(self):
+        response = self.client.post(f'/api/user/loans/{self.loan.pk}/repay/', {'account': 'abc'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_insufficient_balance_leaves_everything_untouched(self):
+        BankAccount.objects.filter(pk=self.account.pk).update(balance=Decimal('100.00'))
+
+        self.assertEqual(self.repay(1).status_code, 400)
+        self.assertEqual(EMI.objects.filter(loan=self.loan, status='paid').count(), 0)
+        self.assertFalse(Transaction.objects.filter(account=self.account).exists())
+
+
+
+# ===================== EMI JOB =====================
+class EMIJobTests(TestCase):
+    def setUp(self):
+        self.today = timezone.localdate()
+        customer = User.objects.create_user('emi-borrower', password='x')
+        self.account = BankAccount.objects.create(user=customer, balance=Decimal('10000.00'))
+        self.loan = Loan.objects.create(
+            user=customer, amount=Decimal('3000.00'), duration_months=3,
+            interest_rate=Decimal('12.00'), status='approved'
+        )
+        # Due 70, 40 and 10 days ago
+        EMI.objects.bulk_create(self.loan.build_emi_schedule(self.today - timedelta(days=100)))
+        self.emis = list(EMI.objects.filter(loan=self.loan).order_by('id'))
+
+    def balance(self):
+        return BankAccount.objects.get(pk=self.account.pk).balance
+
+    def test_covered_emis_are_debited_once(self):
+        result = run_emi_job(self.today, debit=True)
+
+        self.assertEqual((result['debited'], result['overdue'], result['defaulted']), (3, 0, 0))
+        self.assertEqual(self.balance(), Decimal('10000.00') - self.loan.total_payable)
+        self.assertEqual(Loan.objects.get(pk=self.loan.pk).status, 'completed')
+        self.assertEqual(Transaction.objects.filter(transaction_type='emi_repayment').count(), 3)
+
+        self.assertEqual(run_emi_job(self.today, debit=True)['debited'], 0)
+        self.assertEqual(self.balance(), Decimal('10000.00') - self.loan.total_payable)
+
+    def test_unpaid_emis_go_overdue_then_default(self):
+        BankAccount.objects.filter(pk=self.account.pk).update(balance=Decimal('0.00'))
+
+        result = run_emi_job(self.today, debit=True)
+        self.assertEqual((result['debited'], result['overdue'], result['defaulted']), (0, 3, 0))
+        for emi in EMI.objects.filter(loan=self.loan):
+            self.assertEqual(emi.status, 'overdue')
+            self.assertEqual(emi.penalty, (emi.amount * Decimal('0.02')).quantize(Decimal('0.01')))
+        self.assertEqual(run_emi_job(self.today, debit=True)['overdue'], 0)
+
+        # 90 days past due: only the first instalment has reached the default threshold
+        result = run_emi_job(self.today + timedelta(days=21))
+        self.assertEqual(result['defaulted'], 1)
+        self.assertEqual(EMI.objects.get(pk=self.emis[0].pk).status, 'defaulted')
+
+        # Funds arrive: overdue and defaulted instalments are collected with their penalty
+        BankAccount.objects.filter(pk=self.account.pk).update(balance=Decimal('5000.00'))
+        owed = sum(emi.amount + emi.penalty for emi in EMI.objects.filter(loan=self.loan))
+        self.assertEqual(run_emi_job(self.today + timedelta(days=21), debit=True)['debited'], 3)
+        self.assertEqual(self.balance(), Decimal('5000.00') - owed)
+
+    def test_auto_debit_resumes_from_the_checkpoint(self):
+        # A crashed run today got past the first instalment; a checkpoint from an earlier day is reset
+        JobCheckpoint.objects.create(name='emi-auto-debit', run_date=self.today, last_id=self.emis[0].pk)
+        self.assertEqual(auto_debit(self.today, chunk_size=1), 2)
+        self.assertEqual(EMI.objects.get(pk=self.emis[0].pk).status, 'pending')
+        self.assertEqual(JobCheckpoint.objects.get().last_id, self.emis[-1].pk)
+
+        self.assertEqual(auto_debit(self.today + timedelta(days=1), chunk_size=1), 1)
+        self.assertEqual(EMI.objects.get(pk=self.emis[0].pk).status, 'paid')
+
+# ===================== REPLICA ROUTING =====================
+class ReplicaRoutingTests(TestCase):
+    replica_databases = {'default': {}, 'replica': {}}
+
+    def setUp(self):
+        cache.clear()
+        self.router = routers.PrimaryReplicaRouter()
+
+    def test_reads_use_the_replica_only_inside_replica_blocks(self):
+        with override_settings(DATABASES=self.replica_databases):
+            self.assertEqual(self.router.db_for_read(Loan), 'default')
+            with routers.replica_reads():
+                self.assertEqual(self.router.db_for_read(Loan), 'replica')
+                self.assertEqual(self.router.db_for_write(Loan), 'default')
+            self.assertFalse(self.router.allow_migrate('replica', 'bank'))
+
+        # Without a configured replica everything stays on the primary
+        with routers.replica_reads():
+            self.assertEqual(self.router.db_for_read(Loan), 'default')
+
+    def test_committed_writes_pin_the_user_to_the_primary(self):
+        user = User.objects.create_user('pinned', password='x')
+        with override_settings(DATABASES=self.replica_databases):
+            with self.captureOnCommitCallbacks(execute=True):
+                BankAccount.objects.create(user=user)
+            self.assertTrue(routers.is_pinned(user.pk))
+
+
+# ===================== ASYNC READ PATH =====================
+class AsyncReadEndpointTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.customer = User.objects.create_user('async-user', password='x')
+        account = BankAccount.objects.create(user=self.customer)
+        for amount in range(1, 6):
+            Transaction.objects.create(account=account, transaction_type='deposit', amount=Decimal(amount))
+        self.client.force_login(self.customer)
+
+    def test_async_endpoints_match_the_drf_payloads(self):
+        for name in ('dashboard', 'accounts', 'transactions', 'loans'):
+            expected = self.client.get(f'/api/user/{name}/?page_size=2').json()
+            actual = self.client.get(f'/api/async/user/{name}/?page_size=2').json()
+            if isinstance(expected, dict) and expected.get('next'):
+                self.assertEqual(actual['next_cursor'], expected['next_cursor'])
+                expected.pop('next')
+                actual.pop('next')
+            self.assertEqual(actual, expected)
+
+    def test_async_endpoints_require_a_session(self):
+        self.client.logout()
+        self.assertEqual(self.client.get('/api/async/user/accounts/').status_code, 403)
+
+
+# ===================== EVENT PUSH =====================
+class EventPushTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('push-admin', password='x', role='admin')
+        self.customer = User.objects.create_user('push-user', password='x')
+        self.account = BankAccount.objects.create(user=self.customer, balance=Decimal('100.00'))
+        self.user_request = UserRequest.objects.create(
+            user=self.customer, account=self.account, request_type='deposit', amount=Decimal('50.00')
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def approve(self):
+        return self.client.post(
+            f'/api/admin/requests/{self.user_request.pk}/process_request/', {'action': 'approve'}, format='json'
+        )
+
+    def test_stream_is_refused_under_wsgi(self):
+        client = Client()
+        client.force_login(self.customer)
+        self.assertEqual(client.get('/api/async/user/events/').status_code, 503)
+
+    def published(self, user_ids, action):
+        # The stream's event loop runs in its own thread, as under the ASGI server
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever)
+        thread.start()
+
+        async def subscribe(user_id):
+            return broker.subscribe(user_id)
+
+        async def drain(queue):
+            await asyncio.sleep(0)
+            return [queue.get_nowait() for _ in range(queue.qsize())]
+
+        queues = {user_id: asyncio.run_coroutine_threadsafe(subscribe(user_id), loop).result() for user_id in user_ids}
+        try:
+            with self.captureOnCommitCallbacks() as callbacks:
+                action()
+            self.assertEqual(sum(queue.qsize() for queue in queues.values()), 0)
+
+            for callback in callbacks:
+                callback()
+            return {
+                user_id: asyncio.run_coroutine_threadsafe(drain(queue), loop).result()
+                for user_id, queue in queues.items()
+            }
+        finally:
+            for user_id, queue in queues.items():
+                broker.unsubscribe(user_id, queue)
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+    def test_committed_decision_reaches_the_users_open_streams(self):
+        events = self.published([self.customer.pk], lambda: self.assertEqual(self.approve().status_code, 200))
+        event = events[self.customer.pk][-1]
+        self.assertEqual(event['type'], 'request.processed')
+        self.assertEqual(event['request_id'], self.user_request.request_id)
+        self.assertEqual(event['balance'], '150.00')
+
+    def test_every_posting_path_announces_balance_changes(self):
+        other = User.objects.create_user('push-other', password='x')
+        destination = BankAccount.objects.create(user=other)
+        customer = APIClient()
+        customer.force_authenticate(self.customer)
+
+        def post():
+            customer.post(
+                f'/api/user/accounts/{self.account.pk}/transfer/',
+                {'to_account_number': destination.account_number, 'amount': '10.00'}, format='json'
+            )
+            self.client.post('/api/admin/transactions/batch/', [
+                {'account': destination.pk, 'transaction_type': 'deposit', 'amount': '5.00'},
+            ], format='json')
+
+        events = self.published([self.customer.pk, other.pk], post)
+        self.assertEqual(events[self.customer.pk], [{'type': 'balance.changed', 'account': self.account.pk}])
+        self.assertEqual(events[other.pk], [{'type': 'balance.changed', 'account': destination.pk}] * 2)
+
+
+# ===================== OUTBOX =====================
+@override_settings(BANK_OUTBOX_SETTLE_SECONDS=0)
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user('outbox-user', password='x')
+        self.account = BankAccount.objects.create(user=self.customer, balance=Decimal('10.00'))
+
+    def test_events_are_written_with_the_change_and_consumed_once(self):
+        Transaction.objects.create(account=self.account, transaction_type='deposit', amount=Decimal('5.00'))
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                Transaction.objects.create(account=self.account, transaction_type='deposit', amount=Decimal('7.00'))
+                raise ValueError
+        self.assertEqual(OutboxEvent.objects.count(), 1)
+
+        seen = []
+        self.assertEqual(consume_batch('test', seen.extend), 1)
+        self.assertEqual(consume_batch('test', seen.extend), 0)
+        self.assertEqual(seen[0].topic, 'transaction.posted')
+        self.assertEqual(seen[0].payload['amount'], '5.00')
+        self.assertEqual(OutboxCursor.objects.get(name='test').position, seen[0].id)
+
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('outbox-admin', password='x', role='admin'))
+        response = client.get('/api/admin/outbox/', {'after': 0, 'topic': 'transaction.posted'})
+        self.assertEqual([event['id'] for event in response.data['events']], [seen[0].id])
+        self.assertEqual(response.data['next_after'], seen[0].id)
+
+
+# ===================== TRANSFERS =====================
+class TransferTests(TestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user('transfer-user', password='x')
+        self.source = BankAccount.objects.create(user=self.customer, balance=Decimal('100.00'))
+        self.destination = BankAccount.objects.create(user=self.customer, account_type='current')
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def send(self, amount):
+        return self.client.post(
+            f'/api/user/accounts/{self.source.pk}/transfer/',
+            {'to_account_number': self.destination.account_number, 'amount': amount}, format='json'
+        )
+
+    def test_amounts_wider_than_the_column_are_rejected(self):
+        for amount, error in (('1e11', 'amount is too large'), ('Infinity', 'amount must be a number'), ('0', 'amount must be greater than 0')):
+            with self.subTest(amount=amount):
+                response = self.send(amount)
+                self.assertEqual((response.status_code, response.data['error']), (400, error))
+        self.assertFalse(Transaction.objects.exists())
+        self.assertEqual(self.send('9999999999.99').data['error'], 'Insufficient balance')
+
+    def test_inactive_accounts_are_named_in_the_error(self):
+        BankAccount.objects.filter(pk=self.source.pk).update(status='suspended')
+        self.assertEqual(self.send('10.00').data['error'], 'Source account is not active')
+
+        BankAccount.objects.filter(pk=self.source.pk).update(status='active')
+        BankAccount.objects.filter(pk=self.destination.pk).update(status='inactive')
+        self.assertEqual(self.send('10.00').data['error'], 'Destination account is not active')
+        self.assertEqual(BankAccount.objects.get(pk=self.source.pk).balance, Decimal('100.00'))
+        self.assertFalse(Transaction.objects.exists())
+
+
+class ConcurrentTransferTests(TransactionTestCase):
+    workers = 8
+    transfers_per_worker = 25
+
+    def test_cross_transfers_conserve_money_without_deadlocks(self):
+        user = User.objects.create_user('transfers', password='x')
+        accounts = [BankAccount.objects.create(user=user, balance=Decimal('1000.00')) for _ in range(3)]
+        errors = []
+
+        def run(worker):
+            client = APIClient()
+            client.force_authenticate(user)
+            try:
+                for i in range(self.transfers_per_worker):
+                    # Every pair is hit in both directions at once
+                    source = accounts[(worker + i) % 3]
+                    destination = accounts[(worker + i + 1 + worker % 2) % 3]
+                    response = client.post(
+                        f'/api/user/accounts/{source.pk}/transfer/',
+                        {'to_account_number': destination.account_number, 'amount': '1.25'},
+                        format='json'
+                    )
+                    if response.status_code != 201:
+                        errors.append(response.data)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=(worker,)) for worker in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        total = self.workers * self.transfers_per_worker
+        legs = Transaction.objects.filter(transaction_type='transfer')
+        self.assertEqual(legs.count(), 2 * total)
+        self.assertEqual(legs.values('reference').distinct().count(), total)
+        self.assertEqual(sum(leg.amount for leg in legs), 0)
+        balances = BankAccount.objects.filter(pk__in=[account.pk for account in accounts]).values_list('balance', flat=True)
+        self.assertEqual(sum(balances), Decimal('3000.00'))
+
+
+# ===================== ANALYTICS ROLLUPS =====================
+@override_settings(BANK_OUTBOX_SETTLE_SECONDS=0)
+class RollupTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('rollup-admin', password='x', role='admin')
+        customer = User.objects.create_user('rollup-user', password='x')
+        savings = BankAccount.objects.create(user=customer, balance=Decimal('500.00'))
+        current = BankAccount.objects.create(user=customer, account_type='current')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+        Transaction.objects.create(account=savings, transaction_type='withdrawal', amount=Decimal('20.00'))
+        customer_client = APIClient()
+        customer_client.force_authenticate(customer)
+        customer_client.post(
+            f'/api/user/accounts/{savings.pk}/transfer/',
+            {'to_account_number': current.account_number, 'amount': '30.00'}, format='json'
+        )
+        for amount in ('10.00', '15.00'):
+            user_request = UserRequest.objects.create(
+                user=customer, account=savings, request_type='deposit', amount=Decimal(amount)
+            )
+        self.client.post(f'/api/admin/requests/{user_request.pk}/process_request/', {'action': 'approve'}, format='json')
+        self.user_request = user_request
+        loan = Loan.objects.create(user=customer, amount=Decimal('1000.00'), duration_months=6, interest_rate=Decimal('10.00'))
+        self.client.post(f'/api/admin/loans/{loan.pk}/process_loan/', {'action': 'approve'}, format='json')
+
+    def test_incremental_rollups_match_the_backfill(self):
+        drain(ROLLUP_CONSUMER, apply_events)
+        today = timezone.localdate()
+        incremental = analytics_report(today, today)
+        self.assertEqual(incremental['backlog'], {'deposit': 1})
+        self.assertIn(
+            {'day': today, 'account_type': 'current', 'category': 'transfer_in', 'count': 1, 'amount': '30.00'},
+            incremental['transactions']
+        )
+        self.assertEqual(incremental['loans'], [{'day': today, 'category': 'approved', 'count': 1, 'amount': '1000.00'}])
+
+        rebuild_rollups()
+        self.assertEqual(analytics_report(today, today), incremental)
+
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/admin/analytics/')
+        self.assertEqual(response.data['backlog'], {'deposit': 1})
+
+        for params in ({'start': '2026-02-30'}, {'end': '2026-99-01'}, {'start': 'soon'},
+                       {'start': '2026-03-02', 'end': '2026-03-01'}):
+            self.assertEqual(self.client.get('/api/admin/analytics/', params).status_code, 400)
+
+    def test_a_later_decision_moves_the_request_to_its_day(self):
+        # Back-dates setUp's approval, base row and event alike, then completes the request today
+        yesterday = timezone.now() - timedelta(days=1)
+        UserRequest.objects.filter(pk=self.user_request.pk).update(processed_at=yesterday)
+        event = OutboxEvent.objects.get(topic='request.processed')
+        event.payload['processed_at'] = yesterday.isoformat()
+        event.save()
+        drain(ROLLUP_CONSUMER, apply_events)
+        self.client.post(f'/api/admin/requests/{self.user_request.pk}/process_request/', {'action': 'complete'}, format='json')
+        drain(ROLLUP_CONSUMER, apply_events)
+
+        start, end = timezone.localdate(yesterday), timezone.localdate()
+        incremental = analytics_report(start, end)
+        self.assertEqual(
+            [row for row in incremental['requests'] if row['event'] == 'processed'],
+            [{'day': end, 'category': 'deposit', 'count': 1, 'event': 'processed'}]
+        )
+        rebuild_rollups()
+        self.assertEqual(analytics_report(start, end), incremental)
+
+
+# ===================== SYNTHETIC DATA =====================
+class SeederTests(TestCase):
+    def test_seeded_balances_match_the_ledger(self):
+        summary = BankSeeder(prefix='t', batch_size=50, seed=7).run(users=20, transactions=300, loans=10, requests=5)
+
+        self.assertEqual(summary['accounts'], 20)
+        self.assertEqual(Transaction.objects.count(), 300)
+        self.assertEqual(UserRequest.objects.filter(status='pending').count(), 5)
+        self.assertEqual(EMI.objects.count(), summary['emis'])
+        # Postings are dated in generation order, so no day in the history closes overdrawn
+        self.assertTrue(BalanceSnapshot.objects.exists())
+        self.assertFalse(BalanceSnapshot.objects.filter(closing_balance__lt=0).exists())
+        for account in BankAccount.objects.all():
+            self.assertGreaterEqual(account.balance, 0)
+            self.assertEqual(account.balance, Transaction.objects.filter(account=account).aggregate(
+                total=Sum(signed_amount()))['total'])
+
+
+# ===================== METRICS =====================
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        registry.reset()
+        self.customer = User.objects.create_user('metrics-user', password='x')
+        account = BankAccount.objects.create(user=self.customer)
+        Transaction.objects.create(account=account, transaction_type='deposit', amount=Decimal('5.00'))
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def test_requests_are_recorded_per_view(self):
+        # Only the request under test runs with the slow log on
+        with override_settings(BANK_SLOW_REQUEST_MS=0.001), self.assertLogs('bank.slow_requests', 'WARNING') as logs:
+            self.client.get('/api/user/transactions/')
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('bank_transaction', logs.output[0])
+
+        body = self.client.get('/metrics').content.decode()
+        labels = '{view="user-transactions-list",method="GET"}'
+        self.assertIn(f'bank_http_request_duration_seconds_count{labels} 1', body)
+        self.assertIn('bank_http_requests_total{view="user-transactions-list",method="GET",status="200"} 1', body)
+        queries = next(line for line in body.splitlines() if line.startswith(f'bank_http_request_db_queries_sum{labels}'))
+        self.assertGreater(int(queries.split()[-1]), 0)
+        serializer = next(line for line in body.splitlines()
+                          if line.startswith(f'bank_http_request_serializer_seconds_total{labels}'))
+        self.assertGreater(float(serializer.split()[-1]), 0)
+
+    @override_settings(BANK_METRICS_TOKEN='scrape')
+    def test_token_guards_the_endpoint(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape').status_code, 200)
+
+
+# ===================== SIGNED TOKENS =====================
+class SignedTokenTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.customer = User.objects.create_user('token-user', password='x')
+        BankAccount.objects.create(user=self.customer)
+        self.client = APIClient()
+
+    def login(self):
+        response = self.client.post('/api/login/', {'username': 'token-user', 'password': 'x', 'tokens': True}, format='json')
+        self.assertNotIn('sessionid', response.cookies)
+        return response.data
+
+    def test_authenticated_requests_cost_no_queries(self):
+        tokens = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        self.assertEqual(self.client.get('/api/user/dashboard/').data['user']['username'], 'token-user')
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/user/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get('/api/admin/users/').status_code, 403)
+
+    def test_refresh_rotation_and_revocation(self):
+        tokens = self.login()
+        rotated = self.client.post('/api/token/refresh/', {'refresh': tokens['refresh']}, format='json').data
+
+        # Replaying the spent token revokes the whole family
+        replay = self.client.post('/api/token/refresh/', {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(replay.status_code, 401)
+        self.assertEqual(self.client.post('/api/token/refresh/', {'refresh': rotated['refresh']}, format='json').status_code, 401)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {rotated['access']}")
+        response = self.client.get('/api/user/accounts/')
+        self.assertEqual((response.status_code, response['WWW-Authenticate']), (401, 'Bearer'))
+
+        tokens = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+        self.client.post('/api/token/revoke/', {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(self.client.get('/api/user/accounts/').status_code, 401)
+        self.assertEqual(self.client.get('/api/async/user/accounts/').status_code, 401)
+        self.assertEqual(self.client.post('/api/token/refresh/', {'refresh': tokens['refresh']}, format='json').status_code, 401)
@@ -0,0 +1,161 @@
+import math
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+
+from .models import RefreshToken, User
+
+
+ACCESS_SALT = 'bank.tokens.access'
+REFRESH_SALT = 'bank.tokens.refresh'
+
+
+class TokenError(Exception):
+    pass
+
+
+def access_lifetime():
+    return getattr(settings, 'BANK_ACCESS_TOKEN_SECONDS', 300)
+
+
+def refresh_lifetime():
+    return getattr(settings, 'BANK_REFRESH_TOKEN_SECONDS', 7 * 86400)
+
+
+# Revocation state lives in the cache so checking it never touches the database; with more than
+# one worker it needs the shared (Redis) cache. Entries only have to outlive the access tokens.
+def revoked_key(jti):
+    return f'bank:token:revoked:{jti}'
+
+
+def not_before_key(user_id):
+    return f'bank:token:not-before:{user_id}'
+
+
+# ===================== ISSUING =====================
+def issue_access_token(user):
+    # Signed (not encrypted) with SECRET_KEY: carries everything the permission checks read
+    return signing.dumps({
+        'uid': user.pk,
+        'usr': user.username,
+        'role': user.role,
+        'jti': uuid.uuid4().hex,
+        'iat': round(time.time(), 3),
+    }, salt=ACCESS_SALT)
+
+
+def issue_tokens(user):
+    jti = uuid.uuid4().hex
+    RefreshToken.objects.create(
+        jti=jti, user=user, expires_at=timezone.now() + timedelta(seconds=refresh_lifetime())
+    )
+    return {
+        'access': issue_access_token(user),
+        'refresh': signing.dumps({'uid': user.pk, 'jti': jti}, salt=REFRESH_SALT),
+        'token_type': 'Bearer',
+        'expires_in': access_lifetime(),
+    }
+
+
+def rotate_refresh_token(token):
+    # Each refresh token is good for one exchange; the pair it returns replaces it
+    try:
+        claims = signing.loads(token, salt=REFRESH_SALT, max_age=refresh_lifetime())
+    except signing.BadSignature:
+        raise TokenError('Invalid or expired refresh token')
+
+    now = timezone.now()
+    with transaction.atomic():
+        record = (
+            RefreshToken.objects.select_for_update().select_related('user')
+            .filter(jti=claims['jti'], user_id=claims['uid']).first()
+        )
+        if record is None or record.expires_at <= now or not record.user.is_active:
+            raise TokenError('Invalid or expired refresh token')
+        reused = record.revoked_at is not None
+        if not reused:
+            record.revoked_at = now
+            record.save(update_fields=['revoked_at'])
+            return issue_tokens(record.user)
+
+    # A rotated token presented again has leaked: end every session of the user
+    revoke_user_tokens(record.user_id)
+    raise TokenError('Refresh token has been revoked')
+
+
+# ===================== REVOCATION =====================
+def revoke_tokens(refresh=None, access_claims=None):
+    if refresh:
+        try:
+            claims = signing.loads(refresh, salt=REFRESH_SALT)
+        except signing.BadSignature:
+            claims = None
+        if claims:
+            RefreshToken.objects.filter(jti=claims['jti'], revoked_at__isnull=True).update(revoked_at=timezone.now())
+    if access_claims:
+        remaining = access_lifetime() - (time.time() - access_claims['iat'])
+        if remaining > 0:
+            cache.set(revoked_key(access_claims['jti']), True, math.ceil(remaining))
+
+
+def revoke_user_tokens(user_id):
+    RefreshToken.objects.filter(user_id=user_id, revoked_at__isnull=True).update(revoked_at=timezone.now())
+    cache.set(not_before_key(user_id), time.time(), access_lifetime())
+
+
+# ===================== AUTHENTICATION =====================
+def bearer_token(header):
+    parts = header.split()
+    if len(parts) != 2 or parts[0].lower() != 'bearer':
+        return None
+    return parts[1]
+
+
+def decode_access_token(token):
+    try:
+        return signing.loads(token, salt=ACCESS_SALT, max_age=access_lifetime())
+    except signing.BadSignature:
+        raise exceptions.AuthenticationFailed('Invalid or expired token.')
+
+
+def token_user(claims, states):
+    if states.get(revoked_key(claims['jti'])) or claims['iat'] < states.get(not_before_key(claims['uid']), 0):
+        raise exceptions.AuthenticationFailed('Token has been revoked.')
+    # Built from the claims instead of loaded: id, username and role are all a request reads
+    user = User(id=claims['uid'], username=claims['usr'], role=claims['role'])
+    user._state.adding = False
+    return user
+
+
+def authenticate_token(token):
+    claims = decode_access_token(token)
+    states = cache.get_many([revoked_key(claims['jti']), not_before_key(claims['uid'])])
+    return token_user(claims, states), claims
+
+
+async def aauthenticate_token(token):
+    claims = decode_access_token(token)
+    states = await cache.aget_many([revoked_key(claims['jti']), not_before_key(claims['uid'])])
+    return token_user(claims, states), claims
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    # "Authorization: Bearer <access>" from login_view's token mode; zero queries per request.
+    # Requests without the header fall through to session authentication
+    def authenticate(self, request):
+        token = bearer_token(get_authorization_header(request).decode('latin-1'))
+        if token is None:
+            return None
+        return authenticate_token(token)
+
+    def authenticate_header(self, request):
+        # Turns a rejected token into 401 + WWW-Authenticate, the client's cue to refresh
+        return 'Bearer'
@@ -1,6 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import login_view, RegisterView, AdminUserViewSet, AdminBankAccountViewSet, AdminLoanViewSet, AdminRequestViewSet, UserRequestViewSet, UserAccountViewSet, UserTransactionViewSet, UserLoanViewSet
+from . import async_views
+from .views import login_view, token_refresh_view, token_revoke_view, RegisterView, AdminUserViewSet, AdminBankAccountViewSet, AdminLoanViewSet, AdminRequestViewSet, AdminTransactionBatchView, AdminOutboxView, AdminAnalyticsView, UserDashboardView, UserRequestViewSet, UserAccountViewSet, UserTransactionViewSet, UserLoanViewSet
 
 router = DefaultRouter()
 
@@ -20,6 +21,19 @@ urlpatterns = [
     # Auth endpoints (must match React)
     path('login/', login_view, name='login'),       # POST /api/login/
     path('register/', RegisterView.as_view(), name='register'),  # POST /api/register/
+    path('token/refresh/', token_refresh_view, name='token-refresh'),  # POST /api/token/refresh/
+    path('token/revoke/', token_revoke_view, name='token-revoke'),  # POST /api/token/revoke/
+    path('user/dashboard/', UserDashboardView.as_view(), name='user-dashboard'),
+    path('admin/transactions/batch/', AdminTransactionBatchView.as_view(), name='admin-transactions-batch'),
+    path('admin/outbox/', AdminOutboxView.as_view(), name='admin-outbox'),
+    path('admin/analytics/', AdminAnalyticsView.as_view(), name='admin-analytics'),
+
+    # Async read endpoints for ASGI deployments
+    path('async/user/dashboard/', async_views.dashboard, name='async-user-dashboard'),
+    path('async/user/accounts/', async_views.accounts, name='async-user-accounts'),
+    path('async/user/transactions/', async_views.transactions, name='async-user-transactions'),
+    path('async/user/loans/', async_views.loans, name='async-user-loans'),
+    path('async/user/events/', async_views.events, name='async-user-events'),
 
     # Include router for other API endpoints
     path('', include(router.urls)),
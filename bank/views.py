@@ -1,10 +1,14 @@
-from decimal import Decimal
-from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+from datetime import datetime, timedelta
 
+from django.core.cache import cache
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime, parse_date
 from django.db import transaction
 from django.shortcuts import render
 from django.contrib.auth import authenticate, login
+from django.contrib.auth.signals import user_logged_in
+from django.core.exceptions import ImproperlyConfigured
 from django.views.decorators.csrf import csrf_exempt
 
 from rest_framework import viewsets, permissions
@@ -16,6 +20,18 @@ from rest_framework.authentication import SessionAuthentication
 
 from .models import *
 from .serializers import *
+from .ledger import AMOUNT_DIGITS, PostingError, parse_postings, post_batch, balance_as_of, transfer
+from .caching import DASHBOARD_TIMEOUT, AdminCachedResponseMixin, CachedResponseMixin, dashboard_cache_key, invalidate_users
+from .dashboard import build_dashboard
+from .exports import filter_period, statement_response
+from .repayments import RepaymentError, repay_loan
+from .portfolio import check_rate_shift, load_loan_book, reprice
+from .pagination import KeysetCursorPagination, TransactionCursorPagination, CreatedAtCursorPagination
+from .routers import ReplicaReadMixin
+from .events import publish_on_commit
+from .outbox import pending_events, record_event, record_events, outbox_event
+from .rollups import DEFAULT_REPORT_DAYS, analytics_report
+from .tokens import SignedTokenAuthentication, TokenError, issue_tokens, revoke_tokens, rotate_refresh_token
 
 
 # ===================== CSRF EXEMPT SESSION AUTH =====================
@@ -41,12 +57,35 @@ def login_view(request):
     user = authenticate(request, username=username, password=password)
 
     if user is not None:
+        if request.data.get("tokens"):
+            # Stateless mode: no session row; the client sends "Authorization: Bearer <access>"
+            user_logged_in.send(sender=user.__class__, request=request, user=user)
+            return Response({"message": "Login successful", **issue_tokens(user)}, status=200)
         login(request, user)
         return Response({"message": "Login successful"}, status=200)
 
     return Response({"error": "Invalid credentials"}, status=401)
 
 
+@api_view(['POST'])
+@permission_classes([AllowAny])
+@authentication_classes([])
+def token_refresh_view(request):
+    try:
+        return Response(rotate_refresh_token(request.data.get("refresh", "")), status=200)
+    except TokenError as exc:
+        return Response({"error": str(exc)}, status=401)
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+@authentication_classes([SignedTokenAuthentication])
+def token_revoke_view(request):
+    # Token logout: drops the refresh token and, when sent, the access token it came with
+    revoke_tokens(request.data.get("refresh"), request.auth)
+    return Response({"message": "Tokens revoked"}, status=200)
+
+
 # ===================== PERMISSIONS =====================
 def is_admin(user):
     return user.is_authenticated and user.role == 'admin'
@@ -57,26 +96,64 @@ class IsAdminUser(permissions.BasePermission):
         return is_admin(request.user)
 
 
+# ===================== EAGER LOADING =====================
+class EagerLoadingViewMixin:
+    # Applied in filter_queryset so it also covers viewsets that override get_queryset
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        return self.get_serializer_class().setup_eager_loading(queryset)
+
+
+# ===================== STATEMENT EXPORT =====================
+def export_statement(request, transactions, filename):
+    params = request.query_params
+    try:
+        transactions = filter_period(transactions, params.get('start'), params.get('end'))
+        return statement_response(transactions, params.get('output', 'csv'), filename)
+    except ValueError as exc:
+        return Response({'error': str(exc)}, status=400)
+
+
 # ===================== ADMIN VIEWS =====================
-class AdminUserViewSet(viewsets.ModelViewSet):
-    authentication_classes = [CsrfExemptSessionAuthentication]
+class AdminUserViewSet(AdminCachedResponseMixin, EagerLoadingViewMixin, viewsets.ModelViewSet):
+    authentication_classes = [SignedTokenAuthentication, CsrfExemptSessionAuthentication]
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAdminUser]
 
 
-class AdminBankAccountViewSet(viewsets.ModelViewSet):
-    authentication_classes = [CsrfExemptSessionAuthentication]
+class AdminBankAccountViewSet(AdminCachedResponseMixin, EagerLoadingViewMixin, viewsets.ModelViewSet):
+    authentication_classes = [SignedTokenAuthentication, CsrfExemptSessionAuthentication]
     queryset = BankAccount.objects.all()
     serializer_class = BankAccountSerializer
     permission_classes = [IsAdminUser]
+    pagination_class = KeysetCursorPagination
+
+    @action(detail=True, methods=['get'])
+    def statement(self, request, pk=None):
+        account = self.get_object()
+        transactions = Transaction.objects.filter(account=account).order_by('date', 'id')
+        return export_statement(request, transactions, f'statement-{account.account_number}')
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        transactions = Transaction.objects.order_by('account_id', 'date', 'id')
+        return export_statement(request, transactions, 'transactions')
 
 
-class AdminLoanViewSet(viewsets.ModelViewSet):
-    authentication_classes = [CsrfExemptSessionAuthentication]
-    queryset = Loan.objects.all()
+class AdminLoanViewSet(AdminCachedResponseMixin, EagerLoadingViewMixin, viewsets.ModelViewSet):
+    authentication_classes = [SignedTokenAuthentication, CsrfExemptSessionAuthentication]
+    queryset = Loan.objects.order_by('-created_at')
     serializer_class = LoanSerializer
     permission_classes = [IsAdminUser]
+    pagination_class = CreatedAtCursorPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        status = self.request.query_params.get('status')
+        if status:
+            queryset = queryset.filter(status=status)
+        return queryset
 
     @action(detail=True, methods=['post'])
     def process_loan(self, request, pk=None):
@@ -103,42 +180,98 @@ class AdminLoanViewSet(viewsets.ModelViewSet):
             else:
                 return Response({'error': 'Invalid action'}, status=400)
 
+            event = {'loan_id': loan.loan_id, 'status': loan.status, 'amount': loan.amount}
+            record_event('loan.processed', event, loan.user_id)
+            publish_on_commit(loan.user_id, 'loan.processed', event)
+
         return Response({'message': f'Loan {loan.status}'})
 
-    def create_emi_schedule(self, loan):
-        emi_amount = loan.calculate_emi()
-        principal = Decimal(loan.amount)
-        monthly_rate = Decimal(loan.interest_rate) / Decimal(1200)
-        due_date = timezone.now().date() + timedelta(days=30)
-
-        for i in range(1, loan.duration_months + 1):
-            interest = principal * monthly_rate
-            principal_payment = emi_amount - interest
-            principal -= principal_payment
-
-            EMI.objects.create(
-                loan=loan,
-                emi_number=i,
-                due_date=due_date,
-                amount=emi_amount,
-                principal=round(principal_payment, 2),
-                interest=round(interest, 2),
-                status='pending'
+    @action(detail=False, methods=['post'])
+    def bulk_approve(self, request):
+        serializer = BulkApproveSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({'error': 'loan_ids must be a non-empty list of loan ids'}, status=400)
+        loan_ids = serializer.validated_data['loan_ids']
+
+        with transaction.atomic():
+            loans = list(
+                Loan.objects.select_for_update()
+                .filter(pk__in=loan_ids, status='pending')
+            )
+            approved_date = timezone.now()
+            Loan.objects.filter(pk__in=[loan.pk for loan in loans]).update(
+                status='approved',
+                approved_by=request.user,
+                approved_date=approved_date
             )
 
-            due_date += timedelta(days=30)
+            start_date = approved_date.date()
+            emis = []
+            for loan in loans:
+                emis.extend(loan.build_emi_schedule(start_date))
+            EMI.objects.bulk_create(emis)
+            invalidate_users(loan.user_id for loan in loans)
+            events = [(loan.user_id, {'loan_id': loan.loan_id, 'status': 'approved', 'amount': loan.amount}) for loan in loans]
+            record_events([outbox_event('loan.processed', event, user_id) for user_id, event in events])
+            for user_id, event in events:
+                publish_on_commit(user_id, 'loan.processed', event)
+
+        approved = {loan.pk for loan in loans}
+        return Response({
+            'approved': [loan.pk for loan in loans],
+            'skipped': [pk for pk in loan_ids if pk not in approved],
+            'emis_created': len(emis)
+        })
 
+    @action(detail=False, methods=['post'])
+    def reprice(self, request):
+        try:
+            rate_shift = float(request.data.get('rate_shift', 0))
+            horizon = int(request.data['horizon']) if request.data.get('horizon') else None
+        except (TypeError, ValueError):
+            return Response({'error': 'rate_shift must be a number and horizon an integer'}, status=400)
+
+        queryset = Loan.objects.all()
+        statuses = request.data.get('status')
+        if statuses:
+            queryset = queryset.filter(status__in=statuses if isinstance(statuses, list) else [statuses])
+
+        try:
+            _, principal, rates, months = load_loan_book(queryset)
+            check_rate_shift(rate_shift, rates)
+            summary, _ = reprice(principal, rates, months, rate_shift=rate_shift, horizon=horizon)
+        except ImproperlyConfigured as exc:
+            return Response({'error': str(exc)}, status=503)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=400)
+
+        return Response(summary)
 
-class AdminRequestViewSet(viewsets.ModelViewSet):
-    authentication_classes = [CsrfExemptSessionAuthentication]
-    queryset = UserRequest.objects.all()
+    def create_emi_schedule(self, loan):
+        EMI.objects.bulk_create(loan.build_emi_schedule())
+
+
+class AdminRequestViewSet(AdminCachedResponseMixin, EagerLoadingViewMixin, viewsets.ModelViewSet):
+    authentication_classes = [SignedTokenAuthentication, CsrfExemptSessionAuthentication]
+    queryset = UserRequest.objects.order_by('-created_at')
     serializer_class = UserRequestSerializer
     permission_classes = [IsAdminUser]
+    pagination_class = CreatedAtCursorPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        for field in ('status', 'request_type'):
+            value = self.request.query_params.get(field)
+            if value:
+                queryset = queryset.filter(**{field: value})
+        return queryset
 
     @action(detail=True, methods=['post'])
     def process_request(self, request, pk=None):
         user_request = self.get_object()
         action_type = request.data.get('action')
+        previous_status = user_request.status
+        previous_processed_at = user_request.processed_at
 
         with transaction.atomic():
             account = user_request.account
@@ -166,59 +299,225 @@ class AdminRequestViewSet(viewsets.ModelViewSet):
             user_request.processed_at = timezone.now()
             user_request.save()
 
+            event = {
+                'request_id': user_request.request_id,
+                'request_type': user_request.request_type,
+                'status': user_request.status,
+                'previous_status': previous_status,
+                'processed_at': user_request.processed_at,
+                'previous_processed_at': previous_processed_at,
+            }
+            if account:
+                account.refresh_from_db(fields=['balance'])
+                event.update(account=account.pk, balance=str(account.balance))
+            record_event('request.processed', event, user_request.user_id)
+            publish_on_commit(user_request.user_id, 'request.processed', event)
+
         return Response({'message': 'Request processed'})
 
 
+class AdminTransactionBatchView(APIView):
+    authentication_classes = [SignedTokenAuthentication, CsrfExemptSessionAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+
+        try:
+            if upload:
+                file_format = 'csv' if upload.name.lower().endswith('.csv') else 'json'
+                postings = parse_postings(upload.read(), file_format)
+            else:
+                postings = parse_postings(request.data)
+            result = post_batch(postings, description=request.query_params.get('description', 'Batch posting'))
+        except PostingError as exc:
+            return Response({'error': str(exc)}, status=400)
+
+        return Response(result, status=201)
+
+
+class AdminOutboxView(APIView):
+    # Tail of the ledger event stream: consumers pass back next_after to read the following batch
+    authentication_classes = [SignedTokenAuthentication, CsrfExemptSessionAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        try:
+            after = int(request.query_params.get('after', 0))
+            limit = min(max(int(request.query_params.get('limit', 500)), 1), 5000)
+        except ValueError:
+            return Response({'error': 'after and limit must be integers'}, status=400)
+
+        events = pending_events(after, limit, request.query_params.getlist('topic'))
+        return Response({
+            'events': OutboxEventSerializer(events, many=True).data,
+            'next_after': events[-1].id if events else after
+        })
+
+
+class AdminAnalyticsView(APIView):
+    # Daily volumes and request backlog, served from the rollup table only
+    authentication_classes = [SignedTokenAuthentication, CsrfExemptSessionAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        today = timezone.localdate()
+        start = request.query_params.get('start')
+        end = request.query_params.get('end')
+        try:
+            start = parse_date(start) if start else today - timedelta(days=DEFAULT_REPORT_DAYS - 1)
+            end = parse_date(end) if end else today
+        except ValueError:
+            start = end = None
+        if start is None or end is None:
+            return Response({'error': 'start and end must be ISO dates'}, status=400)
+        if start > end:
+            return Response({'error': 'start must not be after end'}, status=400)
+
+        return Response({'start': start, 'end': end, **analytics_report(start, end)})
+
+
 # ===================== USER VIEWS =====================
 class UserDashboardView(APIView):
-    authentication_classes = [CsrfExemptSessionAuthentication]
+    authentication_classes = [SignedTokenAuthentication, CsrfExemptSessionAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        user = request.user
-        return Response({
-            'user': {
-                'id': user.id,
-                'username': user.username,
-                'role': user.role
-            }
-        })
+        key = dashboard_cache_key(request.user.pk)
+        payload = cache.get(key)
+        if payload is None:
+            payload = build_dashboard(request.user)
+            cache.set(key, payload, DASHBOARD_TIMEOUT)
+        return Response(payload)
 
 
-class UserAccountViewSet(viewsets.ReadOnlyModelViewSet):
-    authentication_classes = [CsrfExemptSessionAuthentication]
+class UserAccountViewSet(ReplicaReadMixin, CachedResponseMixin, EagerLoadingViewMixin, viewsets.ReadOnlyModelViewSet):
+    authentication_classes = [SignedTokenAuthentication, CsrfExemptSessionAuthentication]
     serializer_class = BankAccountSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         return BankAccount.objects.filter(user=self.request.user)
 
+    @action(detail=True, methods=['get'])
+    def balance(self, request, pk=None):
+        account = self.get_object()
+        at = timezone.now()
+        raw = request.query_params.get('at')
+        if raw:
+            try:
+                day = parse_date(raw)
+                if day is not None:
+                    # A bare date means the closing balance of that day
+                    at = datetime.combine(day, datetime.max.time())
+                else:
+                    at = parse_datetime(raw)
+            except ValueError:
+                # Well-formed but impossible, e.g. 2026-13-45
+                at = None
+            if at is None:
+                return Response({'error': 'at must be an ISO date or timestamp'}, status=400)
+            if timezone.is_naive(at):
+                at = timezone.make_aware(at)
+
+        return Response({
+            'account': account.account_number,
+            'at': at,
+            'balance': str(balance_as_of(account, at))
+        })
+
+    @action(detail=True, methods=['get'])
+    def statement(self, request, pk=None):
+        account = self.get_object()
+        transactions = Transaction.objects.filter(account=account).order_by('date', 'id')
+        return export_statement(request, transactions, f'statement-{account.account_number}')
+
+    @action(detail=True, methods=['post'])
+    def transfer(self, request, pk=None):
+        source = self.get_object()
+        destination = BankAccount.objects.filter(account_number=request.data.get('to_account_number')).first()
+        if destination is None:
+            return Response({'error': 'Destination account not found'}, status=400)
+
+        try:
+            amount = Decimal(str(request.data.get('amount'))).quantize(Decimal('0.01'))
+        except InvalidOperation:
+            amount = None
+        if amount is None or not amount.is_finite():
+            return Response({'error': 'amount must be a number'}, status=400)
+        if len(amount.as_tuple().digits) > AMOUNT_DIGITS:
+            return Response({'error': 'amount is too large'}, status=400)
+        if amount <= 0:
+            return Response({'error': 'amount must be greater than 0'}, status=400)
+
+        try:
+            debit, credit = transfer(source, destination, amount, request.data.get('description', ''))
+        except PostingError as exc:
+            return Response({'error': str(exc)}, status=400)
+
+        return Response({
+            'reference': debit.reference,
+            'from_account': source.account_number,
+            'to_account': destination.account_number,
+            'amount': str(amount),
+            'transactions': TransactionSerializer([debit, credit], many=True).data
+        }, status=201)
 
-class UserTransactionViewSet(viewsets.ReadOnlyModelViewSet):
-    authentication_classes = [CsrfExemptSessionAuthentication]
+
+class UserTransactionViewSet(ReplicaReadMixin, CachedResponseMixin, EagerLoadingViewMixin, viewsets.ReadOnlyModelViewSet):
+    authentication_classes = [SignedTokenAuthentication, CsrfExemptSessionAuthentication]
     serializer_class = TransactionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = TransactionCursorPagination
 
     def get_queryset(self):
-        return Transaction.objects.filter(account__user=self.request.user)
+        return Transaction.objects.filter(account__user=self.request.user).order_by('-date', '-id')
 
 
-class UserLoanViewSet(viewsets.ReadOnlyModelViewSet):
-    authentication_classes = [CsrfExemptSessionAuthentication]
+class UserLoanViewSet(ReplicaReadMixin, CachedResponseMixin, EagerLoadingViewMixin, viewsets.ReadOnlyModelViewSet):
+    authentication_classes = [SignedTokenAuthentication, CsrfExemptSessionAuthentication]
     serializer_class = LoanSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
 
     def get_queryset(self):
-        return Loan.objects.filter(user=self.request.user)
+        return Loan.objects.filter(user=self.request.user).order_by('-created_at')
+
+    @action(detail=True, methods=['post'])
+    def repay(self, request, pk=None):
+        loan = self.get_object()
+
+        accounts = BankAccount.objects.filter(user=request.user, status='active').order_by('id')
+        if request.data.get('account'):
+            try:
+                accounts = accounts.filter(pk=int(request.data['account']))
+            except (TypeError, ValueError):
+                return Response({'error': 'account must be an account id'}, status=400)
+        account = accounts.first()
+        if account is None:
+            return Response({'error': 'No active account to pay from'}, status=400)
+
+        try:
+            instalments = int(request.data.get('instalments', 1))
+        except (TypeError, ValueError):
+            return Response({'error': 'instalments must be an integer'}, status=400)
+
+        try:
+            result = repay_loan(loan, account, instalments)
+        except RepaymentError as exc:
+            return Response({'error': str(exc)}, status=400)
+
+        return Response(result)
 
 
-class UserRequestViewSet(viewsets.ModelViewSet):
-    authentication_classes = [CsrfExemptSessionAuthentication]
+class UserRequestViewSet(CachedResponseMixin, EagerLoadingViewMixin, viewsets.ModelViewSet):
+    authentication_classes = [SignedTokenAuthentication, CsrfExemptSessionAuthentication]
     serializer_class = UserRequestSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CreatedAtCursorPagination
 
     def get_queryset(self):
-        return UserRequest.objects.filter(user=self.request.user)
+        return UserRequest.objects.filter(user=self.request.user).order_by('-created_at')
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user, status='pending')
@@ -226,7 +525,7 @@ class UserRequestViewSet(viewsets.ModelViewSet):
 
 # ===================== REGISTER =====================
 class RegisterView(APIView):
-    authentication_classes = [CsrfExemptSessionAuthentication]
+    authentication_classes = [SignedTokenAuthentication, CsrfExemptSessionAuthentication]
     permission_classes = [permissions.AllowAny]
 
     def post(self, request):
@@ -4,6 +4,7 @@ Django settings for myproject project.
 Generated by 'django-admin startproject' using Django 6.0.2.
 """
 
+import os
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -38,6 +39,7 @@ AUTH_USER_MODEL = 'bank.User'
 # ===================== REST FRAMEWORK =====================
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
+        'bank.tokens.SignedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -45,9 +47,15 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Signed bearer tokens issued by /api/login/ with {"tokens": true} (see bank/tokens.py)
+BANK_ACCESS_TOKEN_SECONDS = int(os.environ.get('BANK_ACCESS_TOKEN_SECONDS', 300))
+BANK_REFRESH_TOKEN_SECONDS = int(os.environ.get('BANK_REFRESH_TOKEN_SECONDS', 7 * 86400))
+
 
 # ===================== MIDDLEWARE =====================
 MIDDLEWARE = [
+    # Outermost, so its timings cover the rest of the stack (see bank/metrics.py)
+    'bank.metrics.RequestMetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
 
     'django.middleware.security.SecurityMiddleware',
@@ -60,6 +68,15 @@ MIDDLEWARE = [
 ]
 
 
+# ===================== METRICS =====================
+# /metrics serves per-view latency, query and serializer totals in Prometheus format; set a token
+# to require "Authorization: Bearer <token>" from the scraper
+BANK_METRICS_TOKEN = os.environ.get('BANK_METRICS_TOKEN', '')
+
+# Requests slower than this are logged to "bank.slow_requests" with their slowest SQL; unset = off
+BANK_SLOW_REQUEST_MS = int(os.environ['BANK_SLOW_REQUEST_MS']) if os.environ.get('BANK_SLOW_REQUEST_MS') else None
+
+
 # ===================== CORS / CSRF =====================
 CORS_ALLOW_ALL_ORIGINS = False
 
@@ -115,13 +132,100 @@ WSGI_APPLICATION = 'myproject.wsgi.application'
 
 
 # ===================== DATABASE =====================
-DATABASES = {
+# SQLite for local development and tests; set DB_ENGINE (e.g. django.db.backends.postgresql)
+# and the DB_* variables to run on a server database
+DB_ENGINE = os.environ.get('DB_ENGINE', 'django.db.backends.sqlite3')
+
+# Single-node SQLite profile: WAL lets readers run alongside the writer, synchronous=NORMAL
+# is still durable across application crashes in WAL mode, and mmap/cache cut read syscalls.
+# Off by default because WAL is persisted in the database file; set SQLITE_TUNING=1 in deployment
+SQLITE_TUNING = os.environ.get('SQLITE_TUNING', '0') == '1'
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 134217728,
+    'cache_size': -20000,
+    'temp_store': 'MEMORY',
+}
+SQLITE_BUSY_TIMEOUT = 20
+
+if DB_ENGINE == 'django.db.backends.sqlite3':
+    DATABASES = {
+        'default': {
+            'ENGINE': DB_ENGINE,
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            # File-backed test DB: shared-cache in-memory SQLite ignores the busy timeout,
+            # which the concurrent ledger tests rely on
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+        }
+    }
+
+    if SQLITE_TUNING:
+        DATABASES['default']['OPTIONS'] = {
+            'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+            # Atomic blocks take the write lock up front, so two writers wait on the busy
+            # timeout instead of failing with "database is locked" when upgrading a read lock
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': SQLITE_BUSY_TIMEOUT,
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': DB_ENGINE,
+            'NAME': os.environ.get('DB_NAME', 'bankmgt'),
+            'USER': os.environ.get('DB_USER', ''),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', ''),
+            'PORT': os.environ.get('DB_PORT', ''),
+            # Persistent connections, checked before reuse so a restarted server is not an error
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+    }
+
+    # psycopg 3 connection pool (needs psycopg[pool]); replaces persistent connections
+    if os.environ.get('DB_POOL_MAX_SIZE'):
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ['DB_POOL_MAX_SIZE']),
+            'timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        }
+
+    # Streaming read replica for the read-only customer viewsets (see bank/routers.py);
+    # tests mirror it onto the primary
+    if os.environ.get('DB_REPLICA_HOST'):
+        DATABASES['replica'] = {
+            **DATABASES['default'],
+            'HOST': os.environ['DB_REPLICA_HOST'],
+            'PORT': os.environ.get('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+            'TEST': {'MIRROR': 'default'},
+        }
+
+DATABASE_ROUTERS = ['bank.routers.PrimaryReplicaRouter']
+
+# How long a customer keeps reading from the primary after one of their writes commits
+BANK_REPLICA_LAG_SECONDS = int(os.environ.get('BANK_REPLICA_LAG_SECONDS', 5))
+
+
+# ===================== CACHE =====================
+# In-process LRU cache by default; point REDIS_URL at Redis (or any Redis-compatible
+# server) to share cached responses and version keys between workers
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bank',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
     }
 }
 
+if os.environ.get('REDIS_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    }
+
 
 # ===================== PASSWORD VALIDATION =====================
 AUTH_PASSWORD_VALIDATORS = [
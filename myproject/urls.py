@@ -19,11 +19,14 @@ from django.contrib import admin
 from django.urls import path, include
 from django.views.generic import TemplateView
 
+from bank.metrics import metrics_view
+
 
 
 urlpatterns = [
     path('api/', include('bank.urls')),
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
     path('',TemplateView.as_view(template_name='home.html'), name='home'),
     
 ]